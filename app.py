@@ -1,9 +1,23 @@
+import logging
 import pandas as pd
-import plotly.graph_objects as go
 import streamlit as st
-import subprocess
-from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
 from dash_components.components import DashComponents
+from utils.db_pool import connect, engine_status, get_engine
+from utils.drilldown import DRILLDOWN_DAYS, drilldown_queries, parse_user_id
+from utils.fast_read import read_sql_fast
+from utils.general import db_config_from_secrets
+from utils.jobs import JOB_PROGRESS_QUERY, RefreshJobRunner, bootstrap_summaries
+from utils.kpi import KPI_ROW_SIZE, exact_metrics, format_metric, kpi_rows
+from utils.live import LiveListener, live_kpi_value, live_series
+from utils.panel_scheduler import PanelScheduler
+from utils.panels import WALLET_MAX_POINTS, category_shares, panel_queries
+from utils.profiling import PanelProfiler, QueryTimings, explain_analyze
+from utils.query_cache import QueryCache
+from utils.subscriptions import build_sunburst_data
+from utils.timeseries import split_series
 component = DashComponents()
 
 st.set_page_config(page_title="DLsurf Dashboard", layout="wide")
@@ -14,32 +28,181 @@ db_host = st.secrets["database"]["host"]
 db_port = st.secrets["database"]["port"]
 db_name = st.secrets["database"]["name"]
 
-connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-engine = create_engine(connection_string)
+connection_string = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+# One pooled engine per process, shared by every session and rerun
+engine = get_engine(connection_string)
+db_config = db_config_from_secrets(st.secrets["database"])
+# Production database the dashboard copy is synced from, from the optional [source_database] section;
+# without it Refresh Data and Live mode are disabled
+source_secrets = st.secrets.get("source_database")
+source_db_config = db_config_from_secrets(source_secrets) if source_secrets else None
+SOURCE_DATABASE_HELP = "Needs a [source_database] section in .streamlit/secrets.toml"
+
+# Seconds each panel's query results stay cached between reruns
+PANEL_TTLS = {
+    "kpi": 60,
+    "kpi_exact": 900,
+    "cards": 300,
+    "map": 600,
+    "wallet": 600,
+    "category": 900,
+    "subscriptions": 900,
+    "payouts": 900,
+    "browser": 900,
+    "device": 900,
+    "user_activity": 120,
+    "user_downloads": 120,
+}
+
+
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(max_entries=256)
+
+
+@st.cache_resource
+def get_executor():
+    # Shared by all sessions and kept below the engine's pool_size + max_overflow
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="panel-fetch")
+
+
+# Worker processes used to copy tables during a refresh; 1 copies them one after another
+REFRESH_WORKERS = 4
+
+
+@st.cache_resource
+def get_live_listener():
+    # One listener per process; every session in live mode reads its totals
+    return LiveListener(source_db_config)
+
+
+@st.cache_resource
+def get_refresh_runner():
+    # One runner per process, so every session sees the same refresh and can't start a second one
+    query_cache, live_listener = get_query_cache(), get_live_listener()
+
+    def on_complete():
+        query_cache.clear()
+        # The destination now holds what the listener counted, so live totals start again from zero
+        live_listener.reset()
+
+    return RefreshJobRunner(source_db_config, db_config, on_complete=on_complete, workers=REFRESH_WORKERS)
+
+
+@st.cache_resource(show_spinner="Building the dashboard's summary tables…")
+def bootstrap():
+    # Once per process: a database not yet refreshed by this version lacks the rollup and map views
+    # every panel reads, so build them before the first query instead of failing until a refresh
+    return bootstrap_summaries(db_config)
+
+
+query_cache = get_query_cache()
+refresh_runner = get_refresh_runner()
+bootstrap()
+
+# Seconds between progress polls while a refresh is running
+REFRESH_POLL_SECONDS = 2
+# Seconds between checks for the exact KPI counts while they are still running
+KPI_EXACT_POLL_SECONDS = 2
+
+
+# Function to start a query through the shared result cache, returning a Future of its frame. Only the
+# first of identical concurrent queries takes an executor thread; returned frames are shared, so don't
+# mutate them
+def submit_query(query, panel, params=None):
+    def fetch():
+        # Only cache misses get here, so only real executions are timed
+        with connect(engine) as conn, profiler.execution(panel, query, params):
+            return read_sql_fast(conn, query, params)
+
+    return query_cache.submit(query, fetch, get_executor(), params=params, ttl=PANEL_TTLS[panel])
+
+
+@st.cache_resource
+def configure_performance_log():
+    # Panel timings go to stderr as one JSON object per line; cached so reruns don't stack handlers
+    perf_logger = logging.getLogger("dashboard.performance")
+    perf_logger.setLevel(logging.INFO)
+    perf_logger.addHandler(logging.StreamHandler())
+    return perf_logger
+
+
+@st.cache_resource
+def get_query_timings():
+    # Shared by all sessions, so EXPLAIN targets queries that were slow when they actually ran
+    return QueryTimings()
+
+
+configure_performance_log()
+# Timings of this run's panels, shown in the sidebar's Performance panel
+profiler = PanelProfiler(get_query_timings())
+profiled_query = profiler.instrument(submit_query)
+
 
 with open('style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
 # Sidebar
 st.sidebar.header("Dashboard `v1`")
-time_period = st.sidebar.selectbox(
-    "Choose a time period:",
-    ("day", "week", "month", "quarter", "year"),
-    index=1
-
-)
-
-if st.button("Refresh Data"):
-    # Run the main.py script
-    subprocess.run(["python", "main.py"])  # Adjust path as necessary
-    st.success("Data migration complete!")
 
-
-# Function to fetch data from a table
-def get_tables(table_name, engine):
-    with engine.connect() as conn:
-        query = text(f"SELECT * FROM {table_name}")
-        return pd.read_sql(query, conn)
+with st.sidebar.expander("Connection pool"):
+    st.json(engine_status(engine))
+
+# Shared by every session: "coalesced" counts fetches that joined another session's identical query
+with st.sidebar.expander("Query cache"):
+    st.json(query_cache.stats())
+
+# Live mode adds the changes the source's triggers report to the KPI tiles and sparkline cards, and
+# reruns just those two fragments every live_seconds
+live_mode = st.sidebar.toggle("Live mode", key="live_mode", disabled=source_db_config is None,
+                              help=None if source_db_config else SOURCE_DATABASE_HELP)
+if live_mode:
+    live_seconds = st.sidebar.select_slider("Live refresh (seconds)", [2, 5, 10, 30, 60], value=5,
+                                            key="live_seconds")
+    live_listener = get_live_listener()
+    live_listener.start()
+    st.sidebar.caption(f"{live_listener.events} live updates received")
+
+if st.button("Refresh Data", disabled=source_db_config is None,
+             help=None if source_db_config else SOURCE_DATABASE_HELP):
+    # Sync and rollups run in the background; progress shows in the sidebar
+    _, started = refresh_runner.start()
+    if started:
+        st.toast("Data migration started")
+    else:
+        st.info("A data migration is already running.")
+
+
+# Sidebar refresh progress, polled only while a refresh is running
+@st.fragment(run_every=REFRESH_POLL_SECONDS if refresh_runner.is_running() else None)
+def refresh_progress(polling):
+    if not refresh_runner.job_id:
+        return
+    try:
+        with connect(engine) as conn:
+            progress = pd.read_sql(text(JOB_PROGRESS_QUERY), conn, params={"job_id": refresh_runner.job_id})
+    except ProgrammingError:
+        # The job hasn't created its status tables yet
+        progress = pd.DataFrame()
+    if progress.empty:
+        st.caption("Data migration starting…")
+        return
+
+    job_state = progress['job_state'].iat[0]
+    done = int((progress['state'] == 'done').sum())
+    st.progress(done / len(progress), text=f"Data migration {job_state}: {done}/{len(progress)} steps")
+    if job_state in ("failed", "skipped"):
+        st.warning(progress['error'].iat[0])
+    with st.expander("Migration details"):
+        st.dataframe(progress.drop(columns=['job_state', 'error']), hide_index=True)
+
+    # The refresh just finished: rerun the whole page so panels pick up the new data
+    if polling and not refresh_runner.is_running():
+        st.rerun()
+
+
+with st.sidebar:
+    refresh_progress(refresh_runner.is_running())
 
 
 # Function to join user data with another DataFrame
@@ -47,46 +210,11 @@ def join_on_user(df_user, df_2):
     return pd.merge(df_user[['id', 'country']], df_2, left_on='id', right_on='user_id', how='inner')
 
 
-# Function to create metric cards
-def create_cards(position, name, table_name, date_column, time_period, engine):
+# Function to create metric cards from a (period, count) frame
+def create_cards(position, name, series_df):
     with position:
-        with engine.connect() as conn:
-
-
-            # query = f'''SELECT COUNT(id), EXTRACT({time_period} FROM {date_column}) as time_period FROM {table_name} GROUP BY time_period ORDER BY time_period'''
-
-            query = f"""
-            WITH last_5_period AS (
-                SELECT generate_series(
-                    EXTRACT({time_period} FROM NOW())::int - 4, 
-                    EXTRACT({time_period} FROM NOW())::int
-                ) AS time_period
-            )
-            SELECT 
-                COALESCE(COUNT(u.id), 0) AS count,
-                w.time_period AS period
-            FROM 
-                last_5_period w
-            LEFT JOIN (
-                SELECT 
-                    id, 
-                    EXTRACT({time_period} FROM {date_column}) AS period_number
-                FROM 
-                    {table_name}
-                WHERE 
-                    {date_column} >= date_trunc('{time_period}', NOW()) - INTERVAL '4 {time_period}'
-            ) u
-            ON w.time_period = u.period_number
-            GROUP BY w.time_period
-            ORDER BY w.time_period;
-            """
-
-            result = conn.execute(text(query)).fetchall()
-
-        # agg_df = component.aggregate_by_period(data, date_column, time_period)
-        # del (data)
-        fig = component.create_line_plot(result)
-        metrices = component.get_metrices(result)
+        fig = component.create_line_plot(series_df)
+        metrices = component.get_metrices(series_df)
 
         with st.container(border=True):
             st.html(f'<span class="watchlist_card"></span>')
@@ -116,436 +244,289 @@ def create_cards(position, name, table_name, date_column, time_period, engine):
 
                 )
 
-###1St column###
-queries = {
-    "user_count": '''SELECT COUNT(id) FROM public.account_management_user''',
-    "total_views": '''SELECT COUNT(id) FROM public.file_management_fileviewstransaction''',
-    "total_uploads": '''SELECT COUNT(id) FROM public.file_management_userfile''',
-    "total_subscribed": '''SELECT COUNT(id) FROM public.subscription_management_subscriptiontransaction WHERE status = 'ACTIVE';'''
-}
 
-col1, col2, col3, col4 = st.columns(4)
-for col, (key, query) in zip([col1, col2, col3, col4], queries.items()):
-    with col:
-        with st.container():
-            with engine.connect() as connection:
-                # Use the text function to safely execute raw SQL queries
-                result = connection.execute(text(query))
-                count = result.scalar()
-                st.markdown(f"""
-                <div class="custom-metric">
-                    {count}
-                    <div class="custom-label">{key.replace('_', ' ').title()}</div>
-                </div>
-            """, unsafe_allow_html=True)
-st.markdown("<br>", unsafe_allow_html=True)
-
-col1, col2, col3, col4 = st.columns(4)
 
-###2nd column###
-query2 = {
-    "users_active(7_days)": """SELECT COUNT(id) FROM public.account_management_user WHERE last_login >= NOW() - INTERVAL '7 days'""",
-    "users_active(30_days)": """SELECT COUNT(id) FROM public.account_management_user WHERE last_login >= NOW() - INTERVAL '30 days'""",
-    "total_balance": """SELECT SUM(total_balance + paid_balance) AS total_sum FROM public.finance_management_userwallet""",
-    "total_paid_out": """SELECT SUM(paid_balance) AS total_sum FROM public.finance_management_userwallet"""
-}
+###KPI header###
+def render_kpi(slot, data, exact=None, live_changes=None):
+    kpi_values = data['values'].iloc[0]
+    live_changes = live_changes or {}
+    # Tiles with an exact count still pending are shown as estimates
+    exact_values = exact['values'].iloc[0] if exact else pd.Series(dtype=object)
+    approximate = set(exact_metrics()) - set(exact_values.index)
+
+    with slot.container():
+        for i, row in enumerate(kpi_rows()):
+            if i:
+                st.markdown("<br>", unsafe_allow_html=True)
+            for col, key in zip(st.columns(KPI_ROW_SIZE), row):
+                with col:
+                    with st.container():
+                        value = exact_values[key] if key in exact_values.index else kpi_values[key]
+                        value = live_kpi_value(value, live_changes.get(key))
+                        count = format_metric(key, value, approximate=key in approximate)
+                        st.markdown(f"""
+                        <div class="custom-metric">
+                            {count}
+                            <div class="custom-label">{key.replace('_', ' ').title()}</div>
+                        </div>
+                    """, unsafe_allow_html=True)
+
+
+def render_cards(positions, data, live_card_days=None):
+    card_series = split_series(data['series'])
+    if live_card_days:
+        card_series = live_series(card_series, live_card_days)
+    for position, (name, series_df) in zip(positions, card_series.items()):
+        create_cards(position, name, series_df)
 
-for col, (key, query) in zip([col1, col2, col3, col4], query2.items()):
-    with col:
-        with st.container():
-            with engine.connect() as connection:
-                # Use the text function to safely execute raw SQL queries
-                result = connection.execute(text(query))
-                count = result.scalar()
-                if "total_balance" in key or "total_paid_out" in key:
-                    count = f"${count:,.2f}"
-            st.markdown(f"""
-                <div class="custom-metric">
-                    {count}
-                    <div class="custom-label">{key.replace('_', ' ').title()}</div>
-                </div>
-            """, unsafe_allow_html=True)
-
-# Spacing between metrics and plots
-st.markdown("<br>", unsafe_allow_html=True)
-
-# Plotting
-
-col1_row1, col2_row1, col3_row1 = st.columns(3)
-col1_row2, col2_row2, col3_row2 = st.columns(3)
-
-
-create_cards(col1_row1, 'User', 'account_management_user', 'created_at', time_period, engine)
-create_cards(col2_row1, 'Referrals', 'account_management_referraltransaction', 'created_at', time_period, engine)
-create_cards(col3_row1, 'Followers', 'account_management_followerstransaction', 'created_at', time_period, engine)
-create_cards(col1_row2, 'Uploads', 'file_management_userfile', 'created_at', time_period, engine)
-create_cards(col2_row2, 'Downloads', 'file_management_filedownloadtransaction', 'created_at', time_period, engine)
-create_cards(col3_row2, 'Views', 'file_management_fileviewstransaction', 'created_at', time_period, engine)
 
 # Map Plot
-metric = st.sidebar.selectbox(
-    "Choose a map metric",
-    ("Balance", "Users", "File Uploads", "Earning Rate"),
-    index=0
-)
-
-
-def create_map_plot(metric):
-    plot = None
-
-    if metric == 'File Uploads':
-        file_uploads_by_country_query = '''SELECT u.country, COUNT(*) AS File_Count
-                                            FROM file_management_userfile f
-                                            JOIN account_management_user u ON f.user_id = u.id
-                                            GROUP BY u.country'''
-        file_country_data = pd.read_sql(file_uploads_by_country_query, engine)
-        plot = component.map_plot(file_country_data)
-        del file_country_data
-
-    elif metric == 'Balance':
-        balance_by_country_query = '''SELECT u.country,SUM(uw.total_balance) as Total_Balance FROM public.account_management_user u
-                                    JOIN finance_management_userwallet uw
-                                ON u.id = uw.user_id
-                                GROUP BY
-                                1'''
-        wallet_country_data = pd.read_sql(balance_by_country_query, engine)
-        plot = component.map_plot(wallet_country_data)
-        del wallet_country_data
-
-    elif metric == 'Users':
-        user_by_country_query = '''SELECT country, COUNT(id) as Total_Users FROM account_management_user GROUP BY 1'''
-        user_by_country = pd.read_sql(user_by_country_query, engine)
-        plot = component.map_plot(user_by_country)
-
-    elif metric == 'Earning Rate':
-        earning_rate_data = get_tables('finance_management_countrywiseearning', engine)
-        plot = component.map_plot(earning_rate_data[['country_name', 'earning_rate']])
-        del earning_rate_data
-
-    return plot
-
-
-plt = create_map_plot(metric)
-
-st.plotly_chart(plt, config={'scrollZoom': False})
-st.markdown("<br>", unsafe_allow_html=True)
+def render_map(slot, data):
+    with slot:
+        st.plotly_chart(component.map_plot(data['map']), config={'scrollZoom': False})
+
 
 # Balance Plot
-wallet_df_query = ('''SELECT
-  created_at,
-  SUM(paid_balance) OVER (
-    ORDER BY created_at
-    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-  ) AS rolling_paid_balance,
-  SUM(total_balance + paid_balance) OVER (
-    ORDER BY created_at
-    ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
-  ) AS rolling_total_balance
-FROM public.finance_management_userwallet
-ORDER BY created_at''')
-wallet_df = pd.read_sql(wallet_df_query,engine)
-balance_plot = component.line_plot_finances(wallet_df)
-del (wallet_df)
-st.plotly_chart(balance_plot)
-st.markdown("<br>", unsafe_allow_html=True)
+def render_wallet(slot, data):
+    balance_plot = component.line_plot_finances(data['wallet'], max_points=WALLET_MAX_POINTS)
+    with slot:
+        st.plotly_chart(balance_plot)
 
-col1, col2 = st.columns(2)
-st.markdown("<br><br>", unsafe_allow_html=True)
 
 ##### Categorial Views and uploads #####
-with col1:
-    file_category_distribution_query = '''
-    SELECT fc.category_name, COUNT(uf.id) AS upload_count
-    FROM file_management_category fc
-    JOIN file_management_userfile uf ON fc.id = uf.category_id_id
-    GROUP BY fc.category_name;
-    '''
-    upload_df = pd.read_sql(file_category_distribution_query, engine)
-    categorical_view_query = '''
-    SELECT ct.category_name, COUNT(v.id) AS view_count
-    FROM public.file_management_userfile u
-    JOIN public.file_management_fileviewstransaction v ON u.id = v.file_id
-    JOIN public.file_management_category ct ON u.category_id_id = ct.id
-    GROUP BY ct.category_name;
-    '''
-    view_df = pd.read_sql(categorical_view_query, engine)
-
-    # Merge the two DataFrames on the category_name
-    merged_df = pd.merge(upload_df, view_df, on='category_name', how='outer').fillna(0)
-
-    # Calculate percentage for uploads and views
-    merged_df['upload_percentage'] = (merged_df['upload_count'] / merged_df['upload_count'].sum()) * 100
-    merged_df['view_percentage'] = (merged_df['view_count'] / merged_df['view_count'].sum()) * 100
-
-    # Create a new figure
-    fig = go.Figure()
-
-    # Bar plot for upload counts
-    fig.add_trace(go.Bar(
-        x=merged_df['category_name'],
-        y=merged_df['upload_count'],
-        name='Uploads',
-        marker_color='rgba(110, 110, 255, 0.7)',  # Red for uploads
-        text=merged_df['upload_count'],  # Show y (upload count) as text
-        textposition='inside',  # Display text inside the bars
-        hovertemplate='Category: <b>%{x}</b><br>Uploads: <b>%{y}</b><br>Percentage: <b>%{customdata:.1f}%</b><extra></extra>',
-        customdata=merged_df['upload_percentage']  # Percentage in hover tooltip
-    ))
-
-    # Bar plot for view counts
-    fig.add_trace(go.Bar(
-        x=merged_df['category_name'],
-        y=merged_df['view_count'],
-        name='Views',
-        marker_color='rgba(255, 0, 0, 0.7)',  # Light red for views
-        text=merged_df['view_count'],  # Show y (view count) as text
-        textposition='inside',  # Display text inside the bars
-        hovertemplate='Category: <b>%{x}</b><br>Views: <b>%{y}</b><br>Percentage: <b>%{customdata:.1f}%</b><extra></extra>',
-        customdata=merged_df['view_percentage']  # Percentage in hover tooltip
-    ))
-
-    # Update layout to customize the merged plot
-    fig.update_layout(
-        title='Categories: Uploads and Views',
-        title_font=dict(size=16),
-        barmode='group',  # Place bars for uploads and views side by side
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=40, b=20),
-        yaxis=dict(showticklabels=False, showgrid=False),
-        height=400
-    )
+def render_category(slot, data):
+    merged_df = category_shares(data['uploads'], data['views'])
+    fig = component.category_plot(merged_df)
 
     # Display the merged plot in Streamlit
-    st.plotly_chart(fig)
-### Withdraaw method and amount #####
-with col2:
-    query = """    SELECT
-        u.id AS user_id,
-        s.id AS subscription_plan_id,
-        s.name AS subscription_name
-    FROM
-        public.account_management_user u
-    LEFT JOIN
-        public.subscription_management_subscriptiontransaction st
-    ON
-        u.id = st.user_id
-    LEFT JOIN
-        public.subscription_management_subscriptionplanname s
-    ON
-        st.subscription_plan_id = s.id
-    """
-    df = pd.read_sql(query, engine)
-
-    df['status'] = df['subscription_plan_id'].apply(lambda x: 'Subscribed' if pd.notna(x) else 'Unsubscribed')
-
-    subscribed_counts = df[df['status'] == 'Subscribed'].groupby('subscription_name').size().reset_index(name='values')
-
-    subscribed_counts['parent'] = 'Subscribed'
-    subscribed_counts.rename(columns={'subscription_name': 'label'}, inplace=True)
-
-    unsubscribed_count = len(df[df['status'] == 'Unsubscribed'])
-
-    unsubscribed_entry = pd.DataFrame({
-        'label': ['Unsubscribed'],
-        'parent': ['All Users'],
-        'values': [unsubscribed_count]
-    })
-
-    subscribed_entry = pd.DataFrame({
-        'label': ['Subscribed'],
-        'parent': ['All Users'],
-        'values': [subscribed_counts['values'].sum()]
-    })
-
-    root = pd.DataFrame({'label': ['All Users'], 'parent': [''], 'values': [df.shape[0]]})
-
-    sunburst_data = pd.concat([root, subscribed_entry, subscribed_counts, unsubscribed_entry], ignore_index=True)
-    del df, subscribed_counts, unsubscribed_entry, subscribed_entry, root  # Clean up
-    total_value = sunburst_data.iloc[0]['values']
-    sunburst_data['percentage'] = [(value / total_value) * 100 for value in sunburst_data['values']]
-
-    # Create the sunburst chart with a red-to-pink color scale and custom hover info
-    fig = go.Figure(
-        go.Sunburst(
-            labels=sunburst_data['label'],
-            parents=sunburst_data['parent'],
-            values=sunburst_data['values'],
-            hovertemplate=(
-                    '<b>%{label}</b><br>' +
-                    'Users: <b>%{value}</b><br>' +
-                    'Percentage: <b>%{customdata:.1f}</b>%<extra></extra>'
-            ),
-            customdata=sunburst_data['percentage'],  # Pass the percentage data for hover
-            marker=dict(
-                colors=sunburst_data['values'],  # Base the color on the values
-                colorscale=[
-                    [0, 'rgb(255,0,0)'],  # Dark red
-                    [0.5, 'rgb(255,102,102)'],  # Light red
-                    [1, 'rgb(255,182,193)']  # Light pink
-                ],
-            )
-        )
-    )
+    with slot:
+        st.plotly_chart(fig)
 
-    # Update layout with the title
-    fig.update_layout(
-        title='User Subscription Status',
-        margin=dict(t=50, l=0, r=0, b=0)
-    )
+
+##### SunBrust ####
+def render_subscriptions(slot, data):
+    # Only per-plan and subscribed/unsubscribed totals come back from the database
+    sunburst_data = build_sunburst_data(data['status'])
+
+    fig = component.sunburst_plot(sunburst_data)
 
     # Display the figure
-    st.plotly_chart(fig)
-    del sunburst_data
+    with slot:
+        st.plotly_chart(fig)
 
-col1, col2, col3 = st.columns(3)
-##### SunBrust ####
-with col1:
-    withdraw_amount_by_different_method_query = '''SELECT wm.method_name,SUM(wt.amount)
-    	FROM finance_management_withdrawmethod wm
-    	JOIN finance_management_withdrawrequesttransaction wt
-    	ON wm.id = wt.withdraw_method_id GROUP BY
-    1
-    '''
-    result_df = pd.read_sql(withdraw_amount_by_different_method_query, engine)
-    payout_method_plot = component.bar_plot(result_df)
-    payout_method_plot.update_layout(
+
+### Withdraaw method and amount #####
+def render_payouts(slot, data):
+    result_df = data['payouts']
+    payout_method_plot = component.bar_plot(
+        result_df,
         title='Withdraw method and amounts',
-        title_font=dict(size=16),
-        xaxis_title_font=dict(size=16, family='Arial', color='white', weight='bold'),
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=40, b=20),
-        height=400,
-    )
-    payout_method_plot.update_traces(
-        text=result_df['sum'].apply(lambda x: f'${x:,.2f}'),  # Format text inside the bars
-        textposition='inside',  # Position the text inside the bars
-        hovertemplate='Method: <b>%{x}</b><br>Amount: <b>$%{y:,.2f}<b><extra></extra>'  # Hover info
+        text_format='${:,.2f}',  # Format text inside the bars
+        hovertemplate='Method: <b>%{x}</b><br>Amount: <b>$%{y:,.2f}<b><extra></extra>',  # Hover info
     )
-    del result_df
-    st.plotly_chart(payout_method_plot)
+    with slot:
+        st.plotly_chart(payout_method_plot)
+
+
 #### Browser Distribution Plot ####
-with col2:
-    browser_info_query = '''SELECT browser_name,count(id) FROM public.file_management_filedownloadtransaction
-                                GROUP BY browser_name ORDER BY
-                                2 DESC LIMIT 5'''
-    browser_info_df = pd.read_sql(browser_info_query, engine)
-    browser_info_plot = component.bar_plot(browser_info_df)
-    browser_info_plot.update_layout(
+def render_browser(slot, data):
+    browser_info_df = data['browser']
+    browser_info_plot = component.bar_plot(
+        browser_info_df,
         title='Downloads By Browser ',
-        title_font=dict(size=16),
-        xaxis_title_font=dict(size=16, family='Arial', color='white', weight='bold'),
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=40, b=20),
-        height=400,
-    )
-    browser_info_plot.update_traces(
-        text=browser_info_df['count'][::-1],
-        textposition='inside',  # Position the text inside the bars
-        hovertemplate='Browser: <b>%{x}</b><br>Count: <b>%{y}<b><extra></extra>'  # Hover info
+        text_format='{}',
+        hovertemplate='Browser: <b>%{x}</b><br>Count: <b>%{y}<b><extra></extra>',  # Hover info
     )
-    del browser_info_df
-    st.plotly_chart(browser_info_plot)
+    with slot:
+        st.plotly_chart(browser_info_plot)
+
+
 #### Device Distribution Plot ####
-with col3:
-    browser_info_query = '''SELECT device_name,count(id) FROM public.file_management_filedownloadtransaction
-                                    GROUP BY 1 ORDER BY
-                                    2 DESC'''
-    device_info_df = pd.read_sql(browser_info_query, engine)
-    device_info_plot = component.bar_plot(device_info_df)
-    device_info_plot.update_layout(
+def render_device(slot, data):
+    device_info_df = data['device']
+    device_info_plot = component.bar_plot(
+        device_info_df,
         title='Downloads By Device',
-        title_font=dict(size=16),
-        xaxis_title_font=dict(size=16, family='Arial', color='white', weight='bold'),
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=40, b=20),
-        height=400,
+        text_format='{}',
+        hovertemplate='Device: <b>%{x}</b><br>Count: <b>%{y}<b><extra></extra>',  # Hover info
     )
-    device_info_plot.update_traces(
-        text=device_info_df['count'][::-1],
-        textposition='inside',  # Position the text inside the bars
-        hovertemplate='Device: <b>%{x}</b><br>Count: <b>%{y}<b><extra></extra>'  # Hover info
-    )
-    del device_info_df
-    st.plotly_chart(device_info_plot)
+    with slot:
+        st.plotly_chart(device_info_plot)
+
 
 #### User Info DF ######
-user_id = st.text_input("Enter User ID", "1")
-
-col1,col2 = st.columns(2)
-with col1:
-    def get_user_data(user_id, engine):
-        user_info_query = f'''SELECT
-                                COALESCE(v.created_at, u.created_at) AS created_at,
-                                COALESCE(views_count, 0) AS views_count,
-                                COALESCE(uploads_count, 0) AS uploads_count
-                            FROM (
-                                SELECT v.created_at, COUNT(v.id) AS views_count
-                                FROM public.file_management_fileviewstransaction v
-                                JOIN public.file_management_userfile f ON v.file_id = f.id
-                                WHERE f.user_id = {user_id}
-                                GROUP BY v.created_at
-                            ) v
-                            FULL OUTER JOIN (
-                                SELECT f.created_at, COUNT(f.id) AS uploads_count
-                                FROM public.file_management_userfile f
-                                WHERE f.user_id = {user_id}
-                                GROUP BY f.created_at
-                            ) u
-                            ON v.created_at = u.created_at
-                            ORDER BY created_at;'''
-
-        user_df = pd.read_sql(user_info_query, engine)
-        today = pd.to_datetime('today').normalize()
-        date_range = pd.date_range(end=today, periods=30)
-        user_df.set_index('created_at', inplace=True)
-        user_df = user_df.reindex(date_range, fill_value=0).reset_index()
-        user_df.columns = ['date', 'views', 'uploads']
-        fig = go.Figure()
-
-        # Area for views
-        fig.add_trace(go.Scatter(
-            x=user_df['date'],
-            y=user_df['views'],
-            mode='lines',
-            name='Views',
-            line=dict(color='red')
-        ))
-
-        # Area for uploads
-        fig.add_trace(go.Scatter(
-            x=user_df['date'],
-            y=user_df['uploads'],
-            mode='lines',
-            name='Uploads',
-            line=dict(color='royalblue')
-        ))
-
-        # Update layout
-        fig.update_layout(
-            title=f"User Views and Uploads in Last 30 Days for User ID: {user_id}",
-            xaxis_title="Date",
-            yaxis_title="Count",
-            hovermode="x unified"
-        )
-
-        # Display the Plotly chart in Streamlit
-        return fig
-
-
-    fig = get_user_data(user_id, engine)
-    st.plotly_chart(fig)
-with col2:
-
-    downloads_by_country_query = f"""SELECT dt.country_name,COUNT(DISTINCT dt.id) FROM public.file_management_filedownloadtransaction dt JOIN public.file_management_userfile uf
-ON dt.file_id = uf.id WHERE
-uf.user_id = {user_id}
-GROUP BY 1"""
-
-    downloads_by_country_df = pd.read_sql(downloads_by_country_query,engine)
-    downloads_by_country_plot = component.map_plot(downloads_by_country_df)
-    downloads_by_country_plot.update_layout(title=f'Downloads for user {user_id}',
-                                            margin=dict(l=0, r=0, t=40, b=0),
-                                            )
-
-
-    st.plotly_chart(downloads_by_country_plot, config={'scrollZoom': False})
+def render_user_activity(slot, data, user_id):
+    # Already one zero-filled row per day of the window
+    user_df = data['activity']
+    fig = component.activity_plot(
+        user_df, title=f"User Views and Uploads in Last {DRILLDOWN_DAYS} Days for User ID: {user_id}")
+
+    # Display the Plotly chart in Streamlit
+    with slot:
+        st.plotly_chart(fig)
+
+
+def render_user_downloads(slot, data, user_id):
+    downloads_by_country_plot = component.map_plot(data['downloads'], title=f'Downloads for user {user_id}')
+
+    with slot:
+        st.plotly_chart(downloads_by_country_plot, config={'scrollZoom': False})
+
+
+TIME_PERIODS = ("day", "week", "month", "quarter", "year")
+MAP_METRICS = ("Balance", "Users", "File Uploads", "Earning Rate")
+
+# Below-the-fold tabs and their panels; only the open tab's panels run
+LOWER_TABS = ["Categories and subscriptions", "Payouts and downloads", "User drilldown"]
+
+
+# Function to fetch panels concurrently and render each one as soon as its data arrives
+def render_panels(renderers, queries, *render_args):
+    scheduler = PanelScheduler(profiled_query)
+    for panel in renderers:
+        scheduler.add(panel, queries[panel])
+    for panel, data in scheduler.as_completed():
+        render, slot = renderers[panel]
+        with profiler.render(panel):
+            render(slot, data, *render_args)
+
+
+# Whether every one of a panel's queries has a live entry in the shared query cache; only peeks, so
+# polling doesn't skew the cache's hit counts or LRU order
+def is_cached(queries):
+    return all(query_cache.contains(QueryCache.make_key(*(query if isinstance(query, tuple) else (query,))))
+               for query in queries.values())
+
+
+# Function to render the KPI tiles. Both counts go through the query cache, so fragment reruns pick up
+# a refresh. The exact counts are only waited for once cached; until then the estimates show and the
+# fragment polls, rerunning the page once they arrive so it stops. In live mode it reruns every
+# live_seconds instead. If the exact counts fail, the page reruns once to stop polling and keeps the
+# estimates, with the error, for the rest of the session
+def kpi_section(prefetched, has_exact, waiting_for_exact):
+    queries = panel_queries()
+    exact = None
+    if has_exact:
+        if is_cached(queries["kpi_exact"]):
+            exact = prefetched.result_for("kpi_exact", queries["kpi_exact"])
+        elif prefetched.done("kpi_exact"):
+            error = prefetched.error("kpi_exact")
+            if error is not None:
+                st.session_state["kpi_exact_error"] = str(error)
+                st.rerun()
+            # The last fetch landed after a refresh cleared the cache; fetch again in the background
+            prefetched.add("kpi_exact", queries["kpi_exact"])
+    live_changes = get_live_listener().snapshot()[0] if live_mode else None
+    with profiler.render("kpi"):
+        render_kpi(st.container(), prefetched.result_for("kpi", queries["kpi"]), exact, live_changes)
+    if waiting_for_exact and exact is not None and not live_mode:
+        st.rerun()
+
+
+# Function to render the sparkline cards; the period selector only reruns this fragment
+@st.fragment(run_every=live_seconds if live_mode else None)
+def cards_section(prefetched):
+    period = st.selectbox("Choose a time period:", TIME_PERIODS, index=1, key="time_period")
+    col1_row1, col2_row1, col3_row1 = st.columns(3)
+    col1_row2, col2_row2, col3_row2 = st.columns(3)
+    data = prefetched.result_for("cards", panel_queries(time_period=period)["cards"])
+    live_card_days = get_live_listener().snapshot()[1] if live_mode else None
+    with profiler.render("cards"):
+        render_cards([col1_row1, col2_row1, col3_row1, col1_row2, col2_row2, col3_row2], data, live_card_days)
+
+
+# Function to render the country map; the metric selector only reruns this fragment
+@st.fragment
+def map_section(prefetched):
+    metric = st.selectbox("Choose a map metric", MAP_METRICS, index=0, key="map_metric")
+    map_slot = st.container()
+    data = prefetched.result_for("map", panel_queries(metric=metric)["map"])
+    with profiler.render("map"):
+        render_map(map_slot, data)
+
+
+# Function to render the per-user drilldown
+def user_drilldown():
+    user_id = parse_user_id(st.text_input("Enter User ID", "1"))
+    user_activity_col, user_downloads_col = st.columns(2)
+    if user_id is None:
+        st.warning("User ID must be a positive whole number.")
+        return
+
+    render_panels({
+        "user_activity": (render_user_activity, user_activity_col),
+        "user_downloads": (render_user_downloads, user_downloads_col),
+    }, drilldown_queries(user_id), user_id)
+
+
+# Function to render the below-the-fold tabs; switching tabs or changing the user id only reruns this
+# fragment, and panels in closed tabs issue no queries
+@st.fragment
+def lower_sections():
+    categories_tab, payouts_tab, user_tab = st.tabs(LOWER_TABS, key="lower_tab", on_change="rerun")
+    queries = panel_queries()
+
+    if categories_tab.open:
+        with categories_tab:
+            category_col, subscriptions_col = st.columns(2)
+            render_panels({
+                "category": (render_category, category_col),
+                "subscriptions": (render_subscriptions, subscriptions_col),
+            }, queries)
+
+    if payouts_tab.open:
+        with payouts_tab:
+            payouts_col, browser_col, device_col = st.columns(3)
+            render_panels({
+                "payouts": (render_payouts, payouts_col),
+                "browser": (render_browser, browser_col),
+                "device": (render_device, device_col),
+            }, queries)
+
+    if user_tab.open:
+        with user_tab:
+            user_drilldown()
+
+
+# Page layout. Above-the-fold panels are fetched concurrently up front, using the selections kept in
+# session state by the fragments' widgets; the fragments reuse these fetches on a full run
+above_the_fold = panel_queries(st.session_state.get("time_period", TIME_PERIODS[1]),
+                               st.session_state.get("map_metric", MAP_METRICS[0]))
+scheduler = PanelScheduler(profiled_query)
+for panel in ("kpi", "cards", "map", "wallet"):
+    scheduler.add(panel, above_the_fold[panel])
+# Exact counts of the estimated KPI tiles; queued last, the KPI fragment swaps them in when ready
+kpi_exact_error = st.session_state.get("kpi_exact_error")
+if kpi_exact_error:
+    st.warning(f"Exact KPI counts failed, showing estimates: {kpi_exact_error}")
+has_exact_kpi = "kpi_exact" in above_the_fold and not kpi_exact_error
+if has_exact_kpi:
+    scheduler.add("kpi_exact", above_the_fold["kpi_exact"])
+waiting_for_exact_kpi = has_exact_kpi and not is_cached(above_the_fold["kpi_exact"])
+
+kpi_poll_seconds = live_seconds if live_mode else KPI_EXACT_POLL_SECONDS if waiting_for_exact_kpi else None
+st.fragment(run_every=kpi_poll_seconds)(kpi_section)(scheduler, has_exact_kpi, waiting_for_exact_kpi)
+
+# Spacing between metrics and plots
+st.markdown("<br>", unsafe_allow_html=True)
+
+cards_section(scheduler)
+map_section(scheduler)
+st.markdown("<br>", unsafe_allow_html=True)
+
+wallet_slot = st.container()
+with profiler.render("wallet"):
+    render_wallet(wallet_slot, scheduler.result("wallet"))
+st.markdown("<br>", unsafe_allow_html=True)
+
+lower_sections()
+
+# Slowest panels of this run; EXPLAIN re-executes the slowest queries executed by this process, so it
+# only runs on request
+with st.sidebar.expander("Performance"):
+    st.dataframe(profiler.summary(), hide_index=True)
+    if st.button("EXPLAIN slowest queries"):
+        with connect(engine) as conn:
+            for elapsed_ms, panel, query, params in profiler.slowest_queries():
+                st.caption(f"{panel}: {elapsed_ms:.1f} ms")
+                st.code(explain_analyze(conn, query, params), language="text")
@@ -0,0 +1,75 @@
+"""Compare DashComponents.aggregate_by_period with the string-key version it replaced on synthetic frames.
+
+Run from the repository root:
+
+    python -m benchmarks.aggregate_by_period --rows 1000000 10000000 --repeat 3
+
+The same comparison runs as a pytest benchmark, which also checks the results:
+
+    python -m pytest tests/test_components.py --run-benchmarks -m benchmark -s
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from dash_components.components import DashComponents
+
+
+def synthetic_frame(rows, seed=0):
+    """rows of (id, created_at) spread over five years, roughly 1% of them NaT."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01T00:00:00', 's').astype('int64')
+    seconds = rng.integers(0, 5 * 365 * 86400, rows) + start
+    created_at = pd.to_datetime(seconds, unit='s')
+    created_at = created_at.where(rng.random(rows) > 0.01)
+    return pd.DataFrame({'id': np.arange(rows), 'created_at': created_at})
+
+
+def string_key_aggregate(df, date_column, period):
+    """The implementation before the rewrite: formatted string keys on a mutated copy."""
+    df = df.copy()
+    df['year'] = df[date_column].dt.year
+    if period == 'week':
+        df['week'] = df[date_column].dt.isocalendar().week
+        df['week_period'] = df['year'].astype(str) + '-W' + df['week'].astype(str)
+        return df.groupby('week_period')['id'].count().reset_index(name='count')
+    if period == 'month':
+        df['month'] = df[date_column].dt.strftime('%Y-%m')
+        return df.groupby('month')['id'].count().reset_index(name='count')
+    if period == 'quarter':
+        df['quarter'] = df[date_column].dt.to_period('Q').astype(str)
+        return df.groupby('quarter')['id'].count().reset_index(name='count')
+    return df.groupby('year')['id'].count().reset_index(name='count')
+
+
+def median_time(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--periods", nargs="+", default=["week", "month", "quarter", "year"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    component = DashComponents()
+    print(f"{'rows':>12}{'period':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for rows in args.rows:
+        df = synthetic_frame(rows)
+        for period in args.periods:
+            before = median_time(lambda: string_key_aggregate(df, 'created_at', period), args.repeat)
+            after = median_time(lambda: component.aggregate_by_period(df, 'created_at', period), args.repeat)
+            print(f"{rows:>12}{period:>10}{before * 1000:>12.1f}{after * 1000:>12.1f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Time every dashboard panel's queries and figure building against synthetic data at one or more scales.
+
+Point BENCH_DB_HOST, NAME, USER, PASS and PORT (environment or .env) at a scratch Postgres; the
+benchmark-db service in docker-compose.yml is one. Loading drops and recreates the dashboard tables
+there, so never point it at real data. Run from the repository root:
+
+    docker compose --profile benchmark up -d benchmark-db
+    python -m benchmarks.dashboard --scale 10000 1000000 --output bench.json
+    python -m benchmarks.dashboard --scale 10000 1000000 --baseline bench.json
+
+With --baseline, panels slower than the baseline by more than --tolerance are listed and the exit
+status is 1, so the run can gate a deploy.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic_data import load
+from dash_components.components import DashComponents
+from dash_components.figure_factory import FIGURE_CACHE
+from utils.db_manager import DatabaseManager
+from utils.db_pool import get_engine
+from utils.drilldown import drilldown_queries
+from utils.fast_read import read_sql_fast
+from utils.general import load_db_config
+from utils.kpi import format_metric
+from utils.panels import WALLET_MAX_POINTS, category_shares, panel_queries
+from utils.subscriptions import build_sunburst_data
+from utils.timeseries import split_series
+
+# What each panel's renderer builds from its query results, minus the Streamlit calls
+PANEL_FIGURES = {
+    "kpi": lambda c, d: {key: format_metric(key, value) for key, value in d['values'].iloc[0].items()},
+    "kpi_exact": lambda c, d: {key: format_metric(key, value) for key, value in d['values'].iloc[0].items()},
+    "cards": lambda c, d: [c.create_line_plot(series) for series in split_series(d['series']).values()],
+    "map": lambda c, d: c.map_plot(d['map']),
+    "wallet": lambda c, d: c.line_plot_finances(d['wallet'], max_points=WALLET_MAX_POINTS),
+    "category": lambda c, d: c.category_plot(category_shares(d['uploads'], d['views'])),
+    "subscriptions": lambda c, d: c.sunburst_plot(build_sunburst_data(d['status'])),
+    "payouts": lambda c, d: c.bar_plot(d['payouts'], title='Withdraw method and amounts', text_format='${:,.2f}'),
+    "browser": lambda c, d: c.bar_plot(d['browser'], title='Downloads By Browser', text_format='{}'),
+    "device": lambda c, d: c.bar_plot(d['device'], title='Downloads By Device', text_format='{}'),
+    "user_activity": lambda c, d: c.activity_plot(d['activity'], title='User activity'),
+    "user_downloads": lambda c, d: c.map_plot(d['downloads'], title='User downloads'),
+}
+
+# Differences below this many milliseconds are noise, whatever the percentage
+MIN_REGRESSION_MS = 5
+
+
+def median_ms(function, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 2), result
+
+
+def connection_string(db_config):
+    return (f"postgresql+psycopg2://{db_config['DB_USER']}:{db_config['DB_PASS']}@{db_config['DB_HOST']}:"
+            f"{db_config['DB_PORT']}/{db_config['DB_NAME']}")
+
+
+def run_panel(engine, component, panel, queries, repeat):
+    """Median query and cold figure-build times for one panel, plus the rows and bytes its queries return."""
+    data, query_ms = {}, 0.0
+    for key, query in queries.items():
+        sql, params = query if isinstance(query, tuple) else (query, None)
+
+        def fetch():
+            with engine.connect() as conn:
+                return read_sql_fast(conn, sql, params)
+
+        elapsed, data[key] = median_ms(fetch, repeat)
+        query_ms += elapsed
+
+    # One untimed build first, so Plotly's lazy imports don't land on whichever panel runs first.
+    # The figure cache is cleared before every timed build, so this is the cost of a changed result.
+    PANEL_FIGURES[panel](component, data)
+    figure_ms, _ = median_ms(lambda: PANEL_FIGURES[panel](component, data), repeat, before=FIGURE_CACHE.clear)
+    return {
+        "query_ms": round(query_ms, 2),
+        "figure_ms": figure_ms,
+        "rows": sum(len(df) for df in data.values()),
+        "bytes": int(sum(df.memory_usage(deep=True).sum() for df in data.values())),
+    }
+
+
+def run_scale(db_config, scale, args):
+    if args.load:
+        db = DatabaseManager(db_config).connect()
+        try:
+            start = time.perf_counter()
+            sizes = load(db, scale, seed=args.seed)
+            load_seconds = time.perf_counter() - start
+            db.ensure_indexes()
+            db.refresh_rollups(rebuild=True)
+            db.refresh_map_views()
+        finally:
+            db.disconnect()
+    else:
+        sizes, load_seconds = None, None
+
+    engine = get_engine(connection_string(db_config))
+    component = DashComponents()
+    panels = panel_queries(args.period, args.metric)
+    panels.update(drilldown_queries(args.user_id))
+
+    results = {}
+    for panel, queries in panels.items():
+        results[panel] = run_panel(engine, component, panel, queries, args.repeat)
+        print(f"{scale:>10} {panel:<16}{results[panel]['query_ms']:>10.1f} ms query"
+              f"{results[panel]['figure_ms']:>10.1f} ms figure{results[panel]['rows']:>10} rows")
+    return {"scale": scale, "table_rows": sizes, "load_seconds": load_seconds, "panels": results}
+
+
+def regressions(report, baseline, tolerance):
+    """(scale, panel, metric, before, after) for every timing that got slower than the baseline allows."""
+    previous = {run["scale"]: run["panels"] for run in baseline["runs"]}
+    found = []
+    for run in report["runs"]:
+        for panel, timings in run["panels"].items():
+            before = previous.get(run["scale"], {}).get(panel)
+            if not before:
+                continue
+            for metric in ("query_ms", "figure_ms"):
+                if timings[metric] > before[metric] * (1 + tolerance) and \
+                        timings[metric] - before[metric] > MIN_REGRESSION_MS:
+                    found.append((run["scale"], panel, metric, before[metric], timings[metric]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, nargs="+", default=[10_000],
+                        help="rows in the largest table; the others are sized from it")
+    parser.add_argument("--no-load", dest="load", action="store_false",
+                        help="reuse the data already loaded (only meaningful with a single scale)")
+    parser.add_argument("--db-prefix", default="BENCH_DB_")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--period", default="week")
+    parser.add_argument("--metric", default="Balance")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    db_config = load_db_config(args.db_prefix)
+    report = {"args": vars(args), "runs": [run_scale(db_config, scale, args) for scale in args.scale]}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f), args.tolerance)
+        for scale, panel, metric, before, after in found:
+            print(f"REGRESSION scale={scale} {panel} {metric}: {before:.1f} ms -> {after:.1f} ms")
+        if found:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare pd.read_sql with the COPY TO STDOUT reader in utils/fast_read.py on a wide synthetic result.
+
+The query is generated server-side with generate_series, so any scratch Postgres works and nothing is
+loaded. Point BENCH_DB_HOST, NAME, USER, PASS and PORT at it and run from the repository root:
+
+    python -m benchmarks.fast_read --rows 1000000
+"""
+import argparse
+import statistics
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from benchmarks.dashboard import connection_string
+from utils.db_pool import get_engine
+from utils.fast_read import read_sql_fast
+from utils.general import load_db_config
+
+# One column of each type the dashboard's queries return
+QUERY = '''SELECT
+    g AS id,
+    'user_' || g AS username,
+    (g % 7 = 0) AS is_active,
+    (g * 1.37)::numeric(12, 2) AS balance,
+    random() AS score,
+    TIMESTAMPTZ '2024-01-01' + g * INTERVAL '1 second' AS created_at,
+    DATE '2024-01-01' + g % 365 AS day
+    FROM generate_series(1, :rows) AS g'''
+
+
+def median_seconds(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db-prefix", default="BENCH_DB_")
+    args = parser.parse_args()
+
+    engine = get_engine(connection_string(load_db_config(args.db_prefix)))
+    params = {"rows": args.rows}
+    readers = {
+        "read_sql": lambda conn: pd.read_sql(text(QUERY), conn, params=params),
+        "copy": lambda conn: read_sql_fast(conn, QUERY, params),
+        "copy (pyarrow dtypes)": lambda conn: read_sql_fast(conn, QUERY, params, dtype_backend="pyarrow"),
+    }
+
+    baseline = None
+    for name, reader in readers.items():
+        with engine.connect() as conn:
+            seconds, df = median_seconds(lambda: reader(conn), args.repeat)
+        baseline = baseline or seconds
+        memory = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<24}{seconds * 1000:>10.0f} ms{baseline / seconds:>8.1f}x{memory:>10.1f} MB  {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare KPI header latency: one connection and query per tile vs the compiled single statement.
+
+Run from the repository root:
+
+    python -m benchmarks.kpi_header --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from utils.general import load_connection_string
+from utils.kpi import compile_kpi_query
+
+
+# The header as it used to be built: one statement per tile, exactly as app.py ran them. Pinned here
+# rather than derived from KPI_METRICS, whose definitions have since moved to the rollup.
+PER_TILE_QUERIES = [
+    "SELECT COUNT(id) FROM public.account_management_user",
+    "SELECT COUNT(id) FROM public.file_management_fileviewstransaction",
+    "SELECT COUNT(id) FROM public.file_management_userfile",
+    "SELECT COUNT(id) FROM public.subscription_management_subscriptiontransaction WHERE status = 'ACTIVE'",
+    "SELECT COUNT(id) FROM public.account_management_user WHERE last_login >= NOW() - INTERVAL '7 days'",
+    "SELECT COUNT(id) FROM public.account_management_user WHERE last_login >= NOW() - INTERVAL '30 days'",
+    "SELECT SUM(total_balance + paid_balance) AS total_sum FROM public.finance_management_userwallet",
+    "SELECT SUM(paid_balance) AS total_sum FROM public.finance_management_userwallet",
+]
+
+
+def time_per_tile(engine, queries):
+    start = time.perf_counter()
+    for query in queries:
+        with engine.connect() as conn:
+            conn.execute(text(query)).scalar()
+    return time.perf_counter() - start
+
+
+def time_combined(engine, query):
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text(query)).one()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine(load_connection_string(args.secrets))
+    queries = PER_TILE_QUERIES
+    combined = compile_kpi_query()
+
+    # Warm up the pool and the buffer cache so both modes start from the same state
+    time_per_tile(engine, queries)
+    time_combined(engine, combined)
+
+    before = [time_per_tile(engine, queries) for _ in range(args.repeat)]
+    after = [time_combined(engine, combined) for _ in range(args.repeat)]
+
+    print(f"{'mode':<12}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for name, samples in (("per-tile", before), ("combined", after)):
+        print(f"{name:<12}{statistics.median(samples) * 1000:>12.1f}"
+              f"{min(samples) * 1000:>12.1f}{max(samples) * 1000:>12.1f}")
+    print(f"speedup: {statistics.median(before) / statistics.median(after):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
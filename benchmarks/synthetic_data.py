@@ -0,0 +1,232 @@
+"""Synthetic copy of the tables the dashboard reads, at a chosen scale, loaded with COPY.
+
+The scale is the row count of the largest table (file views); the other tables are sized from it
+with SCALE_RATIOS, so --scale 10000000 gives 10M views, 1M users, 2M files and so on.
+"""
+import io
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+COUNTRIES = ["Nepal", "India", "United States", "Germany", "Brazil", "Nigeria", "Indonesia", "Japan",
+             "United Kingdom", "France", "Canada", "Mexico", "Bangladesh", "Pakistan", "Philippines"]
+CATEGORIES = ["Video", "Music", "Documents", "Images", "Software", "Games", "Ebooks", "Archives"]
+BROWSERS = ["Chrome", "Safari", "Firefox", "Edge", "Opera", "Samsung Internet"]
+DEVICES = ["Desktop", "Mobile", "Tablet"]
+WITHDRAW_METHODS = ["PayPal", "Bank Transfer", "eSewa", "Khalti"]
+SUBSCRIPTION_PLANS = ["Basic", "Premium", "Gold"]
+
+# Rows per table as a fraction of the scale; None means a fixed lookup table
+SCALE_RATIOS = OrderedDict([
+    ("account_management_user", 0.1),
+    ("account_management_referraltransaction", 0.02),
+    ("account_management_followerstransaction", 0.1),
+    ("file_management_category", None),
+    ("file_management_userfile", 0.2),
+    ("file_management_fileviewstransaction", 1.0),
+    ("file_management_filedownloadtransaction", 0.25),
+    ("finance_management_userwallet", 0.1),
+    ("finance_management_withdrawmethod", None),
+    ("finance_management_withdrawrequesttransaction", 0.02),
+    ("finance_management_countrywiseearning", None),
+    ("subscription_management_subscriptionplanname", None),
+    ("subscription_management_subscriptiontransaction", 0.03),
+])
+
+# Only the columns the dashboard and the sync read, with the Django-style names of the real schema
+SCHEMA = OrderedDict([
+    ("account_management_user", """
+        id BIGINT PRIMARY KEY, country TEXT, last_login TIMESTAMPTZ, created_at TIMESTAMPTZ NOT NULL"""),
+    ("account_management_referraltransaction", """
+        id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL REFERENCES account_management_user (id),
+        created_at TIMESTAMPTZ NOT NULL"""),
+    ("account_management_followerstransaction", """
+        id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL REFERENCES account_management_user (id),
+        created_at TIMESTAMPTZ NOT NULL"""),
+    ("file_management_category", """
+        id BIGINT PRIMARY KEY, category_name TEXT NOT NULL, created_at TIMESTAMPTZ NOT NULL"""),
+    ("file_management_userfile", """
+        id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL REFERENCES account_management_user (id),
+        category_id_id BIGINT REFERENCES file_management_category (id), created_at TIMESTAMPTZ NOT NULL"""),
+    ("file_management_fileviewstransaction", """
+        id BIGINT PRIMARY KEY, file_id BIGINT NOT NULL REFERENCES file_management_userfile (id),
+        created_at TIMESTAMPTZ NOT NULL"""),
+    ("file_management_filedownloadtransaction", """
+        id BIGINT PRIMARY KEY, file_id BIGINT NOT NULL REFERENCES file_management_userfile (id),
+        country_name TEXT, browser_name TEXT, device_name TEXT, created_at TIMESTAMPTZ NOT NULL"""),
+    ("finance_management_userwallet", """
+        id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL REFERENCES account_management_user (id),
+        total_balance NUMERIC(12, 2) NOT NULL, paid_balance NUMERIC(12, 2) NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL"""),
+    ("finance_management_withdrawmethod", """
+        id BIGINT PRIMARY KEY, method_name TEXT NOT NULL, created_at TIMESTAMPTZ NOT NULL"""),
+    ("finance_management_withdrawrequesttransaction", """
+        id BIGINT PRIMARY KEY, withdraw_method_id BIGINT NOT NULL REFERENCES finance_management_withdrawmethod (id),
+        amount NUMERIC(12, 2) NOT NULL, created_at TIMESTAMPTZ NOT NULL"""),
+    ("finance_management_countrywiseearning", """
+        id BIGINT PRIMARY KEY, country_name TEXT NOT NULL, earning_rate NUMERIC(8, 4) NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL"""),
+    ("subscription_management_subscriptionplanname", """
+        id BIGINT PRIMARY KEY, name TEXT NOT NULL, created_at TIMESTAMPTZ NOT NULL"""),
+    ("subscription_management_subscriptiontransaction", """
+        id BIGINT PRIMARY KEY, user_id BIGINT NOT NULL REFERENCES account_management_user (id),
+        subscription_plan_id BIGINT NOT NULL REFERENCES subscription_management_subscriptionplanname (id),
+        status TEXT NOT NULL, created_at TIMESTAMPTZ NOT NULL"""),
+])
+
+# Foreign key indexes Django creates, added after loading so COPY doesn't maintain them row by row
+INDEXES = [
+    ("account_management_referraltransaction", "user_id"),
+    ("account_management_followerstransaction", "user_id"),
+    ("file_management_userfile", "user_id"),
+    ("file_management_userfile", "category_id_id"),
+    ("file_management_fileviewstransaction", "file_id"),
+    ("file_management_filedownloadtransaction", "file_id"),
+    ("finance_management_userwallet", "user_id"),
+    ("finance_management_withdrawrequesttransaction", "withdraw_method_id"),
+    ("subscription_management_subscriptiontransaction", "user_id"),
+    ("subscription_management_subscriptiontransaction", "subscription_plan_id"),
+]
+
+# Rows are spread over this many days ending now, so the 7/30-day and period windows all have data
+HISTORY_DAYS = 3 * 365
+
+
+def table_sizes(scale):
+    """Rows to generate per table for a scale; lookup tables keep their fixed sizes."""
+    fixed = {
+        "file_management_category": len(CATEGORIES),
+        "finance_management_withdrawmethod": len(WITHDRAW_METHODS),
+        "finance_management_countrywiseearning": len(COUNTRIES),
+        "subscription_management_subscriptionplanname": len(SUBSCRIPTION_PLANS),
+    }
+    return OrderedDict(
+        (table, fixed[table] if ratio is None else max(1, int(scale * ratio))) for table, ratio in SCALE_RATIOS.items()
+    )
+
+
+class SyntheticData:
+    """Generate the dashboard tables chunk by chunk with numpy, so memory stays flat at any scale."""
+
+    def __init__(self, scale, seed=0, chunk_rows=500_000):
+        self.sizes = table_sizes(scale)
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+        self.now = pd.Timestamp.now(tz="UTC").floor("s")
+
+    def chunks(self, table_name):
+        """Yield DataFrames for a table whose columns follow SCHEMA's order."""
+        rows = self.sizes[table_name]
+        rng = np.random.default_rng([self.seed, list(SCALE_RATIOS).index(table_name)])
+        for start in range(0, rows, self.chunk_rows):
+            ids = np.arange(start + 1, min(start + self.chunk_rows, rows) + 1)
+            yield getattr(self, f"_{table_name}")(ids, rng)
+
+    def _timestamps(self, rng, size, newest_first_bias=1.5):
+        # Skewed towards recent days, like a growing product
+        age_days = HISTORY_DAYS * rng.random(size) ** newest_first_bias
+        return self.now - pd.to_timedelta(age_days, unit="D").round("s")
+
+    def _ids_of(self, table_name, rng, size):
+        return rng.integers(1, self.sizes[table_name] + 1, size)
+
+    def _pick(self, rng, choices, size):
+        return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), size)]
+
+    def _account_management_user(self, ids, rng):
+        created_at = self._timestamps(rng, len(ids))
+        last_login = created_at + (self.now - created_at) * rng.random(len(ids))
+        return pd.DataFrame({"id": ids, "country": self._pick(rng, COUNTRIES, len(ids)),
+                             "last_login": last_login.floor("s"), "created_at": created_at})
+
+    def _user_transactions(self, ids, rng):
+        return pd.DataFrame({"id": ids, "user_id": self._ids_of("account_management_user", rng, len(ids)),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    _account_management_referraltransaction = _user_transactions
+    _account_management_followerstransaction = _user_transactions
+
+    def _lookup(self, ids, column, values):
+        return pd.DataFrame({"id": ids, column: np.asarray(values, dtype=object)[ids - 1],
+                             "created_at": self.now - pd.Timedelta(days=HISTORY_DAYS)})
+
+    def _file_management_category(self, ids, rng):
+        return self._lookup(ids, "category_name", CATEGORIES)
+
+    def _finance_management_withdrawmethod(self, ids, rng):
+        return self._lookup(ids, "method_name", WITHDRAW_METHODS)
+
+    def _subscription_management_subscriptionplanname(self, ids, rng):
+        return self._lookup(ids, "name", SUBSCRIPTION_PLANS)
+
+    def _finance_management_countrywiseearning(self, ids, rng):
+        df = self._lookup(ids, "country_name", COUNTRIES)
+        df.insert(2, "earning_rate", rng.uniform(0.5, 5.0, len(ids)).round(4))
+        return df
+
+    def _file_management_userfile(self, ids, rng):
+        return pd.DataFrame({"id": ids, "user_id": self._ids_of("account_management_user", rng, len(ids)),
+                             "category_id_id": self._ids_of("file_management_category", rng, len(ids)),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    def _file_management_fileviewstransaction(self, ids, rng):
+        return pd.DataFrame({"id": ids, "file_id": self._ids_of("file_management_userfile", rng, len(ids)),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    def _file_management_filedownloadtransaction(self, ids, rng):
+        return pd.DataFrame({"id": ids, "file_id": self._ids_of("file_management_userfile", rng, len(ids)),
+                             "country_name": self._pick(rng, COUNTRIES, len(ids)),
+                             "browser_name": self._pick(rng, BROWSERS, len(ids)),
+                             "device_name": self._pick(rng, DEVICES, len(ids)),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    def _finance_management_userwallet(self, ids, rng):
+        # One wallet per user
+        return pd.DataFrame({"id": ids, "user_id": ids,
+                             "total_balance": rng.gamma(2.0, 20.0, len(ids)).round(2),
+                             "paid_balance": rng.gamma(1.5, 10.0, len(ids)).round(2),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    def _finance_management_withdrawrequesttransaction(self, ids, rng):
+        return pd.DataFrame({"id": ids,
+                             "withdraw_method_id": self._ids_of("finance_management_withdrawmethod", rng, len(ids)),
+                             "amount": rng.gamma(2.0, 15.0, len(ids)).round(2),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+    def _subscription_management_subscriptiontransaction(self, ids, rng):
+        return pd.DataFrame({"id": ids, "user_id": self._ids_of("account_management_user", rng, len(ids)),
+                             "subscription_plan_id": self._ids_of("subscription_management_subscriptionplanname",
+                                                                  rng, len(ids)),
+                             "status": self._pick(rng, ["ACTIVE", "ACTIVE", "ACTIVE", "EXPIRED", "CANCELLED"],
+                                                  len(ids)),
+                             "created_at": self._timestamps(rng, len(ids))})
+
+
+def create_schema(db):
+    """Drop and recreate the synthetic tables on a connected DatabaseManager."""
+    for table_name in reversed(SCHEMA):
+        db.execute_query(f"DROP TABLE IF EXISTS {table_name} CASCADE")
+    for table_name, columns in SCHEMA.items():
+        db.execute_query(f"CREATE TABLE {table_name} ({columns})")
+    db.commit()
+
+
+def load(db, scale, seed=0, chunk_rows=500_000):
+    """Recreate the schema and fill it at the given scale; returns {table: rows loaded}."""
+    create_schema(db)
+    data = SyntheticData(scale, seed=seed, chunk_rows=chunk_rows)
+    for table_name in SCHEMA:
+        for df in data.chunks(table_name):
+            # pandas' CSV writer is much faster than rendering the values one by one in Python
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S%z")
+            buffer.seek(0)
+            db.copy_csv(table_name, buffer, columns=list(df.columns), header=False)
+        print(f"Loaded {data.sizes[table_name]} rows into {table_name}")
+
+    for table_name, column in INDEXES:
+        db.execute_query(f"CREATE INDEX {table_name}_{column}_idx ON {table_name} ({column})")
+    db.execute_query("ANALYZE")
+    db.commit()
+    return dict(data.sizes)
@@ -1,159 +1,235 @@
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
+
+from dash_components.figure_factory import memoized_figure
+
+
+def lttb_indices(x, y, threshold):
+    """Pick `threshold` points with Largest-Triangle-Three-Buckets, always keeping the first and last."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    bucket_size = (n - 2) / (threshold - 2)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+
+        # Third vertex is the average of the next bucket (the last point for the final bucket)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        indices[i + 1] = a
+
+    return indices
+
+
+def downsample_lttb(x, y, threshold):
+    """Downsample a series to at most `threshold` points while keeping its visual shape."""
+    x = pd.Series(x).reset_index(drop=True)
+    y = pd.Series(y).reset_index(drop=True)
+    numeric_x = x.astype('int64') if pd.api.types.is_datetime64_any_dtype(x) else x
+    indices = lttb_indices(numeric_x, y, threshold)
+    return x.iloc[indices], y.iloc[indices]
+
+
+# numpy datetime unit each period's integer bucket codes are counted in
+PERIOD_UNITS = {'day': 'D', 'week': 'D', 'month': 'M', 'quarter': 'M', 'year': 'Y'}
+
+
+def period_codes(dates, period):
+    """Integer bucket codes for a date column plus the numpy unit they count, without string formatting.
+
+    Codes are bucket starts as days, months or years since 1970; NaT stays the int64 minimum.
+    """
+    if period not in PERIOD_UNITS:
+        raise ValueError(f"Unknown period: {period}")
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    elif isinstance(dates.dtype, pd.DatetimeTZDtype):
+        # Bucket on local wall-clock time, as date_trunc does on a timestamptz in the session time zone
+        dates = dates.dt.tz_localize(None)
+
+    unit = PERIOD_UNITS[period]
+    raw = dates.to_numpy(dtype='datetime64[ns]')
+    nat = np.isnat(raw)
+    days = raw.astype('datetime64[D]').view('int64')
+    if period == 'week':
+        # 1970-01-01 was a Thursday; step back to the Monday
+        codes = days - (days + 3) % 7
+    elif period == 'day':
+        codes = days
+    else:
+        # Calendar flooring is slow per row, so floor each day in the covered span once and look rows up
+        present = days[~nat]
+        first, last = (present.min(), present.max()) if len(present) else (0, 0)
+        lookup = np.arange(first, last + 1).astype('datetime64[D]').astype(f'datetime64[{unit}]').view('int64')
+        if period == 'quarter':
+            lookup = lookup - lookup % 3
+        codes = lookup[np.where(nat, 0, days - first)]
+    codes[nat] = np.iinfo(np.int64).min
+    return codes, unit
 
 
 class DashComponents:
     def __init__(self):
         pass
 
-    def aggregate_by_period(self, df, date_column, period):
-        df[date_column] = pd.to_datetime(df[date_column])
-        df['year'] = df[date_column].dt.year
-
-        if period == 'day':
-            agg_df = df.groupby(date_column)['id'].count().reset_index(name='count')
-
-        elif period == 'week':
-            df['week'] = df[date_column].dt.isocalendar().week
-            df['week_period'] = df['year'].astype(str) + '-W' + df['week'].astype(str)
-            agg_df = df.groupby('week_period')['id'].count().reset_index(name='count')
+    def aggregate_by_period(self, df, date_column, period, value_columns='id', agg='count'):
+        """Aggregate rows into period buckets, returning a 'period' column of bucket starts plus the aggregates.
 
-        elif period == 'month':
-            df['month'] = df[date_column].dt.strftime('%Y-%m')
-            agg_df = df.groupby('month')['id'].count().reset_index(name='count')
+        Buckets match the SQL date_trunc ones (weeks start on Monday). agg is anything DataFrame.agg takes;
+        a single value column with a string agg gives one column named after it, e.g. 'count'.
+        The input frame is never modified.
+        """
+        codes, unit = period_codes(df[date_column], period)
+        valid = codes != np.iinfo(np.int64).min  # NaT
+        values = df[value_columns] if valid.all() else df[value_columns][valid]
 
-        elif period == 'quarter':
-            df['quarter'] = df[date_column].dt.to_period('Q').astype(str)
-            agg_df = df.groupby('quarter')['id'].count().reset_index(name='count')
+        agg_df = values.groupby(codes[valid], sort=True).agg(agg)
+        if isinstance(agg_df, pd.Series):
+            agg_df = agg_df.to_frame(agg if isinstance(agg, str) else agg_df.name)
+        elif isinstance(agg_df.columns, pd.MultiIndex):
+            agg_df.columns = ['_'.join(map(str, column)) for column in agg_df.columns]
 
-        elif period == 'year':
-            agg_df = df.groupby('year')['id'].count().reset_index(name='count')
-
-        else:
-            raise ValueError(f"Unknown period: {period}")
-
-        return agg_df
+        agg_df.index = pd.DatetimeIndex(agg_df.index.to_numpy().astype(f'datetime64[{unit}]').astype('datetime64[ns]'))
+        return agg_df.rename_axis('period').reset_index()
 
+    @memoized_figure
     def create_line_plot(self, aggregated_df):
-        date_col = [x[1] for x in aggregated_df]  # first column is the date column
-
-        fig_spark = go.Figure(
-            data=go.Scatter(
-                x=date_col,  # Ensure x-values are set
-                y=[x[0] for x in aggregated_df],
-                mode="lines",
-                fill="tozeroy",
-                line_color="red",
-                fillcolor="pink",
-                hovertemplate=(
+        return {
+            'data': [{
+                'type': 'scatter',
+                'x': aggregated_df['period'].to_numpy(),  # Bucket start dates
+                'y': aggregated_df['count'].to_numpy(),
+                'mode': 'lines',
+                'fill': 'tozeroy',
+                'line': {'color': 'red'},
+                'fillcolor': 'pink',
+                'hovertemplate': (
                     '<b>%{x}</b><br>'  # Date
                     'Count: <b>%{y}<extra></extra></b>'  # Count value
-                )
-            ),
-        )
-
-        fig_spark.update_xaxes(visible=False, fixedrange=True)
-        fig_spark.update_yaxes(visible=False, fixedrange=True)
-        fig_spark.update_layout(
-            showlegend=False,
-            height=50,
-            margin=dict(t=10, l=0, b=0, r=0, pad=0),
-        )
-
-        return fig_spark
+                ),
+            }],
+            'layout': {
+                'xaxis': {'visible': False, 'fixedrange': True},
+                'yaxis': {'visible': False, 'fixedrange': True},
+                'showlegend': False,
+                'height': 50,
+                'margin': {'t': 10, 'l': 0, 'b': 0, 'r': 0, 'pad': 0},
+            },
+        }
+
     def get_metrices(self, aggregated_df):
-        try:
-            current_metrice = aggregated_df[-1][0]
-        except:
-            return 0,0
-        try:
-            previous_metrice = aggregated_df[-2][0]
-        except:
-            previous_metrice = 0
+        counts = aggregated_df['count'].tolist()
+        if not counts:
+            return 0, 0
+        current_metrice = counts[-1]
+        previous_metrice = counts[-2] if len(counts) > 1 else 0
 
         percentage_change = ((current_metrice - previous_metrice) / (previous_metrice + 1)) * 100
 
         return current_metrice, percentage_change
 
-    def map_plot(self, aggregated_df):
+    @memoized_figure
+    def map_plot(self, aggregated_df, title=None):
         col_2 = aggregated_df.columns[-1]  # This is the value for coloring the map
         col_1 = aggregated_df.columns[0]  # This is the location (e.g., country names)
-
-        fig = go.Figure(data=go.Choropleth(
-            locations=aggregated_df[col_1],
-            z=aggregated_df[col_2],
-            text=aggregated_df[col_1],  # Optional: add text to hover info
-            hovertemplate=(
-                f'Country: <b>%{{location}}</b><br>'  # Display the location
-                f'{col_2}: <b>%{{z}}</b><extra></extra>'  # Display the value associated with the location
-            ),
-            autocolorscale=False,
-            reversescale=False,
-            marker_line_color='black',
-            colorscale='Emrld',
-            marker_line_width=1,
-            locationmode='country names',
-        ))
-
-        fig.update_layout(
-            template='plotly_dark',
-            plot_bgcolor='rgba(0, 0, 0, 0)',
-            paper_bgcolor='rgba(0, 0, 0, 0)',
-            margin=dict(l=0, r=0, t=0, b=0),
-            height=350,
-            geo=dict(
-                showframe=False,  # Hide the map frame
-                bgcolor=None,  # Set the background color to black
-                landcolor='white',
-            ),
-            dragmode='pan',  # Enable panning but not zooming
-        )
-
-        return fig
-    def line_plot_finances(self, wallet_data_formatted):
-        fig = go.Figure()
-
-        # Add Total Balance trace
-        fig.add_trace(go.Scatter(
-            x=wallet_data_formatted['created_at'],
-            y=wallet_data_formatted['rolling_total_balance'],
-            mode='lines',
-            name='Total Balance',
-            hovertemplate='Date:<b> %{x}</b><br>Total Balance:<b> $%{y:.2f}</b><extra></extra>'
-        ))
-
-        # Add Paid Balance trace
-        fig.add_trace(go.Scatter(
-            x=wallet_data_formatted['created_at'],
-            y=wallet_data_formatted['rolling_paid_balance'],
-            mode='lines',
-            name='Paid Balance',
-            hovertemplate='Date:<b> %{x}</b><br>Paid Amount:<b> $%{y:.2f}</b><extra></extra>'
-        ))
-
-        fig.update_layout(
-        title={
-            'text': 'Total Balance and Total Paid Amount Over Time',
-            'font': {'size': 16},
-            'x': 0.5,  # Center the title
-            'xanchor': 'center'
-        },
-            yaxis_title='Amount',
-            template='plotly_dark',
-            plot_bgcolor='rgba(0, 0, 0, 0)',
-            paper_bgcolor='rgba(0, 0, 0, 0)',
-            margin=dict(l=0, r=0, t=20, b=20),
-            height=300,
-            xaxis_title_font=dict(size=16, family='Arial', color='white', weight='bold'),
-
-        )
-
-        return fig
-
-    def bar_plot(self, aggregated_df, orientation='v'):
-        fig = go.Figure()
-
-        col2_name = aggregated_df.columns[1]
+        locations = aggregated_df[col_1].to_numpy()
+
+        layout = {
+            'template': 'plotly_dark',
+            'plot_bgcolor': 'rgba(0, 0, 0, 0)',
+            'paper_bgcolor': 'rgba(0, 0, 0, 0)',
+            'margin': {'l': 0, 'r': 0, 't': 40 if title else 0, 'b': 0},
+            'height': 350,
+            'geo': {
+                'showframe': False,  # Hide the map frame
+                'bgcolor': None,  # Set the background color to black
+                'landcolor': 'white',
+            },
+            'dragmode': 'pan',  # Enable panning but not zooming
+        }
+        if title:
+            layout['title'] = {'text': title}
+
+        return {
+            'data': [{
+                'type': 'choropleth',
+                'locations': locations,
+                'z': aggregated_df[col_2].to_numpy(),
+                'text': locations,  # Optional: add text to hover info
+                'hovertemplate': (
+                    f'Country: <b>%{{location}}</b><br>'  # Display the location
+                    f'{col_2}: <b>%{{z}}</b><extra></extra>'  # Display the value associated with the location
+                ),
+                'autocolorscale': False,
+                'reversescale': False,
+                'marker': {'line': {'color': 'black', 'width': 1}},
+                'colorscale': 'Emrld',
+                'locationmode': 'country names',
+            }],
+            'layout': layout,
+        }
+
+    @memoized_figure
+    def line_plot_finances(self, wallet_data_formatted, max_points=None):
+        x_total, y_total = wallet_data_formatted['created_at'], wallet_data_formatted['rolling_total_balance']
+        x_paid, y_paid = wallet_data_formatted['created_at'], wallet_data_formatted['rolling_paid_balance']
+        if max_points:
+            x_total, y_total = downsample_lttb(x_total, y_total, max_points)
+            x_paid, y_paid = downsample_lttb(x_paid, y_paid, max_points)
+
+        return {
+            'data': [
+                # Total Balance trace
+                {
+                    'type': 'scatter',
+                    'x': x_total.to_numpy(),
+                    'y': y_total.to_numpy(),
+                    'mode': 'lines',
+                    'name': 'Total Balance',
+                    'hovertemplate': 'Date:<b> %{x}</b><br>Total Balance:<b> $%{y:.2f}</b><extra></extra>',
+                },
+                # Paid Balance trace
+                {
+                    'type': 'scatter',
+                    'x': x_paid.to_numpy(),
+                    'y': y_paid.to_numpy(),
+                    'mode': 'lines',
+                    'name': 'Paid Balance',
+                    'hovertemplate': 'Date:<b> %{x}</b><br>Paid Amount:<b> $%{y:.2f}</b><extra></extra>',
+                },
+            ],
+            'layout': {
+                'title': {
+                    'text': 'Total Balance and Total Paid Amount Over Time',
+                    'font': {'size': 16},
+                    'x': 0.5,  # Center the title
+                    'xanchor': 'center',
+                },
+                'xaxis': {'title': {'font': {'size': 16, 'family': 'Arial', 'color': 'white', 'weight': 'bold'}}},
+                'yaxis': {'title': {'text': 'Amount'}},
+                'template': 'plotly_dark',
+                'plot_bgcolor': 'rgba(0, 0, 0, 0)',
+                'paper_bgcolor': 'rgba(0, 0, 0, 0)',
+                'margin': {'l': 0, 'r': 0, 't': 20, 'b': 20},
+                'height': 300,
+            },
+        }
+
+    @memoized_figure
+    def bar_plot(self, aggregated_df, orientation='v', title=None, text_format=None, hovertemplate=None):
+        # Bars are sorted by value, so text_format (e.g. '${:,.2f}') is applied to the sorted values
         sorted_df = aggregated_df.sort_values(by=aggregated_df.columns[1], ascending=True)
 
         counts = sorted_df[sorted_df.columns[1]]
@@ -165,25 +241,113 @@ class DashComponents:
             [1, 'darkred']  # End color (dark red)
         ]
 
-
-        x = sorted_df[sorted_df.columns[0]]
-        y = sorted_df[sorted_df.columns[1]]
-
-        # Add bar trace with custom hover information and colorscale
-        fig.add_trace(go.Bar(
-            x=x,
-            y=y,
-            orientation=orientation,  # Set orientation based on the parameter
-            marker=dict(
-                color=normalized_counts,  # Apply the normalized counts to the color
-                colorscale=red_colorscale,  # Use the red colorscale
-                # colorbar=dict(title='Count')  # Optional: Add colorbar to show scale
-            )
-        ))
-
-        fig.update_layout(
-            xaxis=dict(showticklabels=False, showgrid=False) if orientation == 'h' else {},
-            yaxis=dict(showticklabels=False, showgrid=False) if orientation == 'v' else {}
-        )
-
-        return fig
\ No newline at end of file
+        # Bar trace with custom hover information and colorscale
+        bar = {
+            'type': 'bar',
+            'x': sorted_df[sorted_df.columns[0]].to_numpy(),
+            'y': counts.to_numpy(),
+            'orientation': orientation,  # Set orientation based on the parameter
+            'marker': {
+                'color': normalized_counts.to_numpy(),  # Apply the normalized counts to the color
+                'colorscale': red_colorscale,  # Use the red colorscale
+            },
+        }
+        if text_format:
+            bar['text'] = [text_format.format(value) for value in counts]
+            bar['textposition'] = 'inside'  # Position the text inside the bars
+        if hovertemplate:
+            bar['hovertemplate'] = hovertemplate
+
+        hidden_axis = {'showticklabels': False, 'showgrid': False}
+        layout = {
+            'xaxis': {**(hidden_axis if orientation == 'h' else {}),
+                      'title': {'font': {'size': 16, 'family': 'Arial', 'color': 'white', 'weight': 'bold'}}},
+            'yaxis': hidden_axis if orientation == 'v' else {},
+            'template': 'plotly_dark',
+            'margin': {'l': 0, 'r': 0, 't': 40, 'b': 20},
+            'height': 400,
+        }
+        if title:
+            layout['title'] = {'text': title, 'font': {'size': 16}}
+
+        return {'data': [bar], 'layout': layout}
+
+    @memoized_figure
+    def category_plot(self, merged_df):
+        # Grouped bars of uploads and views per category, with each one's share in the hover
+        def category_bars(name, count_column, percentage_column, color):
+            return {
+                'type': 'bar',
+                'x': merged_df['category_name'].to_numpy(),
+                'y': merged_df[count_column].to_numpy(),
+                'name': name,
+                'marker': {'color': color},
+                'text': merged_df[count_column].to_numpy(),  # Show y (count) as text
+                'textposition': 'inside',  # Display text inside the bars
+                'hovertemplate': f'Category: <b>%{{x}}</b><br>{name}: <b>%{{y}}</b><br>'
+                                 'Percentage: <b>%{customdata:.1f}%</b><extra></extra>',
+                'customdata': merged_df[percentage_column].to_numpy(),  # Percentage in hover tooltip
+            }
+
+        return {
+            'data': [
+                category_bars('Uploads', 'upload_count', 'upload_percentage', 'rgba(110, 110, 255, 0.7)'),
+                category_bars('Views', 'view_count', 'view_percentage', 'rgba(255, 0, 0, 0.7)'),
+            ],
+            'layout': {
+                'title': {'text': 'Categories: Uploads and Views', 'font': {'size': 16}},
+                'barmode': 'group',  # Place bars for uploads and views side by side
+                'template': 'plotly_dark',
+                'margin': {'l': 0, 'r': 0, 't': 40, 'b': 20},
+                'yaxis': {'showticklabels': False, 'showgrid': False},
+                'height': 400,
+            },
+        }
+
+    @memoized_figure
+    def sunburst_plot(self, sunburst_data):
+        # Red-to-pink sunburst of subscription status, with each slice's share in the hover
+        return {
+            'data': [{
+                'type': 'sunburst',
+                'labels': sunburst_data['label'].to_numpy(),
+                'parents': sunburst_data['parent'].to_numpy(),
+                'values': sunburst_data['values'].to_numpy(),
+                'hovertemplate': (
+                        '<b>%{label}</b><br>' +
+                        'Users: <b>%{value}</b><br>' +
+                        'Percentage: <b>%{customdata:.1f}</b>%<extra></extra>'
+                ),
+                'customdata': sunburst_data['percentage'].to_numpy(),  # Pass the percentage data for hover
+                'marker': {
+                    'colors': sunburst_data['values'].to_numpy(),  # Base the color on the values
+                    'colorscale': [
+                        [0, 'rgb(255,0,0)'],  # Dark red
+                        [0.5, 'rgb(255,102,102)'],  # Light red
+                        [1, 'rgb(255,182,193)']  # Light pink
+                    ],
+                },
+            }],
+            'layout': {
+                'title': {'text': 'User Subscription Status'},
+                'margin': {'t': 50, 'l': 0, 'r': 0, 'b': 0},
+            },
+        }
+
+    @memoized_figure
+    def activity_plot(self, user_df, title):
+        # Daily views and uploads lines from a (date, views, uploads) frame
+        return {
+            'data': [
+                {'type': 'scatter', 'x': user_df['date'].to_numpy(), 'y': user_df['views'].to_numpy(),
+                 'mode': 'lines', 'name': 'Views', 'line': {'color': 'red'}},
+                {'type': 'scatter', 'x': user_df['date'].to_numpy(), 'y': user_df['uploads'].to_numpy(),
+                 'mode': 'lines', 'name': 'Uploads', 'line': {'color': 'royalblue'}},
+            ],
+            'layout': {
+                'title': {'text': title},
+                'xaxis': {'title': {'text': 'Date'}},
+                'yaxis': {'title': {'text': 'Count'}},
+                'hovermode': 'x unified',
+            },
+        }
@@ -0,0 +1,56 @@
+import functools
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.query_cache import QueryCache
+
+# Figure specs shared by every session and rerun. Keys hash the input data itself, so an entry can't go
+# stale; the TTL and size only bound memory.
+FIGURE_CACHE = QueryCache(max_entries=128, default_ttl=3600)
+
+
+def fingerprint(value, digest=None):
+    """Hash DataFrames, Series, arrays and plain (nested) values by content; returns the hex digest."""
+    digest = digest or hashlib.blake2b(digest_size=16)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        dtypes = list(value.dtypes) if isinstance(value, pd.DataFrame) else [value.dtype]
+        digest.update(repr((type(value).__name__, columns, [str(d) for d in dtypes])).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        fingerprint(pd.Series(value.ravel()), digest)
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            fingerprint(value[key], digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            fingerprint(item, digest)
+    else:
+        digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def memoized_figure(build):
+    """Decorate a method that returns a figure as a plain dict {'data': [...], 'layout': {...}}.
+
+    The dict is cached under a hash of the arguments and wrapped in a go.Figure without Plotly's
+    property validation, which is most of the cost of building a figure. Every call gets its own
+    Figure, so callers may still update it without touching the cached spec.
+    """
+    name = f"{build.__module__}.{build.__qualname__}"
+
+    @functools.wraps(build)
+    def wrapper(self, *args, **kwargs):
+        key = (name, fingerprint((args, kwargs)))
+        hit, spec = FIGURE_CACHE.get(key)
+        if not hit:
+            spec = build(self, *args, **kwargs)
+            FIGURE_CACHE.set(key, spec)
+        return go.Figure(spec, _validate=False)
+
+    return wrapper
@@ -0,0 +1,19 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true",
+                     help="also run the timing benchmarks marked 'benchmark' (slow, builds 10M-row frames)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing benchmark, skipped unless --run-benchmarks is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark; pass --run-benchmarks to run it")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
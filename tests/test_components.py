@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.aggregate_by_period import median_time, string_key_aggregate, synthetic_frame
+from dash_components.components import DashComponents
+
+# pandas period frequency whose start_time is the bucket start aggregate_by_period should produce
+PERIOD_FREQS = {'day': 'D', 'week': 'W-SUN', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+
+def reference(df, date_column, period, value_columns='id', agg='count'):
+    """Bucket with pandas periods: slow, but obviously right."""
+    dates = df[date_column]
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_localize(None)
+    starts = dates.dt.to_period(PERIOD_FREQS[period]).dt.start_time.rename('period')
+    return df[value_columns].groupby(starts).agg(agg)
+
+
+def frame(timestamps, **columns):
+    created_at = pd.Series(pd.to_datetime(timestamps, format='ISO8601'), dtype='datetime64[ns]')
+    return pd.DataFrame({'id': np.arange(len(created_at)), 'created_at': created_at, **columns})
+
+
+@pytest.fixture
+def component():
+    return DashComponents()
+
+
+@pytest.mark.parametrize('period', PERIOD_FREQS)
+def test_matches_pandas_periods(component, period):
+    df = synthetic_frame(20000, seed=1)
+    result = component.aggregate_by_period(df, 'created_at', period)
+    expected = reference(df, 'created_at', period)
+    assert result['period'].tolist() == expected.index.tolist()
+    assert result['count'].tolist() == expected.tolist()
+
+
+def test_weeks_start_on_monday_across_the_year_end(component):
+    # 2024-12-30 is a Monday; the week it starts runs into 2025 and ends on Sunday 2025-01-05
+    df = frame(['2024-12-29 23:59', '2024-12-30 00:00', '2025-01-01 12:00', '2025-01-05 23:59',
+                '2025-01-06 00:00'])
+    result = component.aggregate_by_period(df, 'created_at', 'week')
+    assert result['period'].tolist() == [pd.Timestamp('2024-12-23'), pd.Timestamp('2024-12-30'),
+                                         pd.Timestamp('2025-01-06')]
+    assert result['count'].tolist() == [1, 3, 1]
+    assert result['period'].tolist() == reference(df, 'created_at', 'week').index.tolist()
+
+
+@pytest.mark.parametrize('period, starts', [
+    ('month', ['2024-12-01', '2025-01-01']),
+    ('quarter', ['2024-10-01', '2025-01-01']),
+    ('year', ['2024-01-01', '2025-01-01']),
+])
+def test_calendar_periods_across_the_year_end(component, period, starts):
+    df = frame(['2024-12-31 23:59:59', '2025-01-01 00:00:00'])
+    result = component.aggregate_by_period(df, 'created_at', period)
+    assert result['period'].tolist() == [pd.Timestamp(start) for start in starts]
+    assert result['count'].tolist() == [1, 1]
+
+
+@pytest.mark.parametrize('period', PERIOD_FREQS)
+def test_all_nat_and_empty_frames(component, period):
+    for df in (frame([None, None, None]), frame([])):
+        result = component.aggregate_by_period(df, 'created_at', period)
+        assert list(result.columns) == ['period', 'count']
+        assert result.empty
+        assert result['period'].dtype == 'datetime64[ns]'
+
+
+def test_nat_rows_are_dropped(component):
+    df = frame(['2025-03-03', None, '2025-03-04'])
+    result = component.aggregate_by_period(df, 'created_at', 'week')
+    assert result['count'].tolist() == [2]
+
+
+@pytest.mark.parametrize('period', PERIOD_FREQS)
+def test_tz_aware_input_buckets_on_local_time(component, period):
+    df = synthetic_frame(5000, seed=2)
+    df['created_at'] = df['created_at'].dt.tz_localize('UTC').dt.tz_convert('America/New_York')
+    result = component.aggregate_by_period(df, 'created_at', period)
+    expected = reference(df, 'created_at', period)
+    assert result['period'].tolist() == expected.index.tolist()
+    assert result['count'].tolist() == expected.tolist()
+
+
+def test_late_evening_in_a_time_zone_stays_on_its_local_day(component):
+    df = frame(['2025-01-06 03:00'])
+    df['created_at'] = df['created_at'].dt.tz_localize('UTC').dt.tz_convert('America/New_York')
+    # 22:00 on Sunday 2025-01-05 in New York, so the week before the UTC one
+    result = component.aggregate_by_period(df, 'created_at', 'week')
+    assert result['period'].tolist() == [pd.Timestamp('2024-12-30')]
+
+
+def test_several_value_columns_and_aggregations(component):
+    df = frame(['2025-01-01', '2025-01-02', '2025-02-01'], amount=[1.0, 2.0, 4.0], fee=[0.5, 0.5, 1.0])
+    result = component.aggregate_by_period(df, 'created_at', 'month', value_columns=['amount', 'fee'],
+                                           agg=['sum', 'max'])
+    assert list(result.columns) == ['period', 'amount_sum', 'amount_max', 'fee_sum', 'fee_max']
+    assert result['amount_sum'].tolist() == [3.0, 4.0]
+    assert result['fee_max'].tolist() == [0.5, 1.0]
+    expected = reference(df, 'created_at', 'month', ['amount', 'fee'], ['sum', 'max'])
+    assert result['amount_sum'].tolist() == expected[('amount', 'sum')].tolist()
+
+
+def test_single_column_with_a_named_aggregation(component):
+    df = frame(['2025-01-01', '2025-01-02'], amount=[1.0, 2.0])
+    result = component.aggregate_by_period(df, 'created_at', 'year', value_columns='amount', agg='sum')
+    assert list(result.columns) == ['period', 'sum']
+    assert result['sum'].tolist() == [3.0]
+
+
+def test_input_frame_is_not_modified(component):
+    df = synthetic_frame(1000)
+    before = df.copy()
+    component.aggregate_by_period(df, 'created_at', 'week')
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_unknown_period(component):
+    with pytest.raises(ValueError):
+        component.aggregate_by_period(frame(['2025-01-01']), 'created_at', 'fortnight')
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('rows', [1_000_000, 10_000_000])
+@pytest.mark.parametrize('period', ['week', 'month', 'quarter', 'year'])
+def test_benchmark_against_string_keys(component, rows, period):
+    df = synthetic_frame(rows)
+    before = median_time(lambda: string_key_aggregate(df, 'created_at', period), 3)
+    after = median_time(lambda: component.aggregate_by_period(df, 'created_at', period), 3)
+    print(f"{rows} rows, {period}: {before * 1000:.1f} ms before, {after * 1000:.1f} ms after, "
+          f"{before / after:.1f}x")
+    assert component.aggregate_by_period(df, 'created_at', period)['count'].sum() == df['created_at'].notna().sum()
+    assert after < before
@@ -0,0 +1,18 @@
+import pytest
+
+from utils.drilldown import MAX_USER_ID, parse_user_id
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", 1),
+    (" 42 ", 42),
+    ("007", 7),
+    (str(MAX_USER_ID), MAX_USER_ID),
+])
+def test_valid_ids(value, expected):
+    assert parse_user_id(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "0", "-1", "1.5", "abc", "²", "1²", "⑤", str(MAX_USER_ID + 1)])
+def test_invalid_ids_give_none(value):
+    assert parse_user_id(value) is None
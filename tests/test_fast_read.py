@@ -0,0 +1,111 @@
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pandas as pd
+import psycopg2.extensions
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from utils import fast_read
+from utils.db_manager import DatabaseManager
+from utils.fast_read import read_copy, read_sql_fast
+
+Column = namedtuple("Column", "name type_code")
+
+
+class FakeCursor:
+    """Answers the LIMIT 0 probe with fixed columns and writes a fixed COPY payload."""
+
+    def __init__(self, columns, payload=b""):
+        self.description = None
+        self._columns = columns
+        self._payload = payload
+        self.mogrify_params = []
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def mogrify(self, query, params):
+        # Like psycopg2: no parameters leave the query alone, a mapping is interpolated with %
+        self.mogrify_params.append(params)
+        return (query if params is None else query % params).encode()
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        self.description = self._columns
+
+    def copy_expert(self, query, buffer):
+        buffer.write(self._payload)
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+COLUMNS = [Column("country_name", 25), Column("downloads", 20), Column("day", 1082)]
+
+
+@pytest.fixture(params=["arrow", "pandas"])
+def parser(request, monkeypatch):
+    if request.param == "pandas":
+        monkeypatch.setattr(fast_read, "pa_csv", None)
+    return request.param
+
+
+def test_empty_result_keeps_columns_and_dtypes(parser):
+    df = read_copy(FakeCursor(COLUMNS), "SELECT ... WHERE false")
+    assert list(df.columns) == ["country_name", "downloads", "day"]
+    assert len(df) == 0
+    assert df["downloads"].dtype == "int64"
+    assert pd.api.types.is_datetime64_any_dtype(df["day"])
+
+
+def test_rows_are_parsed(parser):
+    df = read_copy(FakeCursor(COLUMNS, b'Nepal,3,19000\n"a,b",4,\n'), "SELECT ...")
+    assert df["country_name"].tolist() == ["Nepal", "a,b"]
+    assert df["downloads"].tolist() == [3, 4]
+    assert df["day"].iloc[0] == pd.Timestamp("2022-01-08")
+    assert pd.isna(df["day"].iloc[1])
+
+
+def test_empty_result_with_arrow_dtypes():
+    df = read_copy(FakeCursor(COLUMNS), "SELECT ...", dtype_backend="pyarrow")
+    assert len(df) == 0
+    assert isinstance(df["downloads"].dtype, pd.ArrowDtype)
+
+
+def test_driver_sql_without_params_keeps_literal_percent_signs():
+    cursor = FakeCursor(COLUMNS)
+    read_copy(cursor, "SELECT ... WHERE country_name LIKE 'Ne%'")
+    assert cursor.mogrify_params == [None]
+
+
+def test_read_frame_with_a_literal_percent_sign():
+    cursor = FakeCursor(COLUMNS, b"Nepal,3,19000\n")
+    db = DatabaseManager({})
+    db.connection = FakeConnection(cursor)
+    df = db.read_frame("SELECT ... WHERE country_name LIKE 'Ne%'")
+    assert df["country_name"].tolist() == ["Nepal"]
+
+
+def test_read_sql_fast_binds_compiled_sql_with_a_mapping(monkeypatch):
+    # SQLAlchemy compiles a literal % to %%; binding even without parameters turns it back into %
+    cursor = FakeCursor(COLUMNS)
+    monkeypatch.setattr(psycopg2.extensions, "connection", FakeConnection)
+    conn = SimpleNamespace(connection=SimpleNamespace(dbapi_connection=FakeConnection(cursor)),
+                           dialect=postgresql.psycopg2.dialect())
+    read_sql_fast(conn, "SELECT ... WHERE country_name LIKE 'Ne%'")
+    assert cursor.mogrify_params == [{}]
+    assert "LIKE 'Ne%'" in cursor.executed[0]
+
+
+def test_unsupported_column_type_falls_back():
+    assert read_copy(FakeCursor([Column("payload", 3802)]), "SELECT ...") is None
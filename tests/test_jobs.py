@@ -0,0 +1,61 @@
+import pytest
+
+from utils import jobs
+
+
+class FakeDestination:
+    """Stands in for DatabaseManager, reporting a fixed sequence of missing_summaries() results."""
+
+    def __init__(self, missing):
+        self.missing = list(missing)
+        self.calls = []
+
+    def __call__(self, config):
+        return self
+
+    def connect(self):
+        self.calls.append("connect")
+        return self
+
+    def missing_summaries(self):
+        return self.missing.pop(0)
+
+    def execute_query(self, query, params=None):
+        self.calls.append(query)
+
+    def refresh_rollups(self):
+        self.calls.append("refresh_rollups")
+
+    def refresh_map_views(self):
+        self.calls.append("refresh_map_views")
+
+    def disconnect(self):
+        self.calls.append("disconnect")
+
+
+@pytest.fixture
+def destination(monkeypatch):
+    def install(*missing):
+        fake = FakeDestination(missing)
+        monkeypatch.setattr(jobs, "DatabaseManager", fake)
+        return fake
+    return install
+
+
+def test_nothing_to_build(destination):
+    fake = destination([])
+    assert jobs.bootstrap_summaries({}) == []
+    assert fake.calls == ["connect", "disconnect"]
+
+
+def test_builds_missing_summaries_under_the_refresh_lock(destination):
+    fake = destination(["activity_daily_rollup"], ["activity_daily_rollup", "map_country_users"])
+    assert jobs.bootstrap_summaries({}) == ["activity_daily_rollup", "map_country_users"]
+    assert fake.calls == ["connect", "SELECT pg_advisory_lock(%s)", "refresh_rollups", "refresh_map_views",
+                          "disconnect"]
+
+
+def test_skips_what_a_concurrent_refresh_built(destination):
+    fake = destination(["activity_daily_rollup"], [])
+    assert jobs.bootstrap_summaries({}) == []
+    assert "refresh_rollups" not in fake.calls
@@ -0,0 +1,15 @@
+from collections import OrderedDict
+
+from utils.kpi import compile_kpi_query, rollup_total
+
+
+def test_rollup_sums_are_cast_back_to_bigint():
+    # SUM over a BIGINT column is numeric, which the readers turn into floats
+    query = compile_kpi_query(OrderedDict([("user_count", rollup_total("account_management_user"))]))
+    assert ("(SUM(count) FILTER (WHERE dimension = 'total' AND source_table = 'account_management_user'))"
+            '::bigint AS "user_count"') in query
+
+
+def test_exact_metrics_are_not_cast():
+    query = compile_kpi_query(OrderedDict([("user_count", rollup_total("account_management_user", "exact"))]))
+    assert query == 'SELECT * FROM (SELECT COUNT(*) AS "user_count" FROM public.account_management_user) AS t0'
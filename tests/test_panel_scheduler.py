@@ -0,0 +1,31 @@
+from concurrent.futures import Future
+
+from utils.panel_scheduler import PanelScheduler
+
+
+def settled(value=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+    return future
+
+
+def test_error_reports_a_failed_query_without_waiting():
+    pending = Future()
+    futures = {"ok": settled("rows"), "slow": pending, "bad": settled(error=RuntimeError("timeout"))}
+    scheduler = PanelScheduler(lambda query, panel, params: futures[query])
+    scheduler.add("kpi", {"a": "ok", "b": "slow"})
+    scheduler.add("kpi_exact", {"values": "bad"})
+    assert scheduler.error("kpi") is None
+    assert str(scheduler.error("kpi_exact")) == "timeout"
+
+
+def test_as_completed_with_a_shared_future():
+    shared = settled("rows")
+    scheduler = PanelScheduler(lambda query, panel, params: shared)
+    scheduler.add("uploads", {"a": "SELECT 1", "b": "SELECT 1"})
+    scheduler.add("views", {"a": "SELECT 1"})
+    assert sorted(scheduler.as_completed()) == [("uploads", {"a": "rows", "b": "rows"}),
+                                                ("views", {"a": "rows"})]
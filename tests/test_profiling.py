@@ -0,0 +1,45 @@
+from concurrent.futures import Future
+
+import pandas as pd
+
+from utils.profiling import PanelProfiler, QueryTimings
+
+
+def cached_submit(query, panel, params=None):
+    future = Future()
+    future.set_result(pd.DataFrame({"n": [1, 2]}))
+    return future
+
+
+def test_cache_hits_are_counted_but_not_timed():
+    profiler = PanelProfiler()
+    assert len(profiler.instrument(cached_submit)("SELECT 1", "kpi").result()) == 2
+    row = profiler.summary().iloc[0]
+    assert (row["queries"], row["executed"], row["query_ms"], row["rows"]) == (1, 0, 0.0, 2)
+    assert profiler.slowest_queries() == []
+
+
+def test_executions_are_timed_and_kept_across_runs():
+    timings = QueryTimings()
+    first_run = PanelProfiler(timings)
+    with first_run.execution("kpi", "SELECT slow", {"id": 1}):
+        pass
+    with first_run.execution("cards", "SELECT fast"):
+        pass
+    assert first_run.summary().set_index("panel").loc["kpi", "executed"] == 1
+
+    # A later run served from the cache still EXPLAINs what was slow when it ran
+    timings.record(500.0, "kpi", "SELECT slow", {"id": 1})
+    later_run = PanelProfiler(timings)
+    later_run.instrument(cached_submit)("SELECT slow", "kpi", {"id": 1}).result()
+    slowest = later_run.slowest_queries()
+    assert [(panel, query, params) for _, panel, query, params in slowest] == [
+        ("kpi", "SELECT slow", {"id": 1}), ("cards", "SELECT fast", None)]
+    assert slowest[0][0] == 500.0
+
+
+def test_timings_keep_the_most_recent_queries():
+    timings = QueryTimings(max_entries=2)
+    for i, ms in enumerate([30.0, 10.0, 20.0]):
+        timings.record(ms, "panel", f"SELECT {i}")
+    assert [query for _, _, query, _ in timings.slowest()] == ["SELECT 2", "SELECT 1"]
@@ -0,0 +1,188 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from utils.query_cache import QueryCache
+
+
+class ThreadExecutor:
+    """Counts submissions and runs each on a thread of its own, so a test can hold a fetch open."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.threads = []
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        thread = threading.Thread(target=run)
+        self.threads.append(thread)
+        thread.start()
+        return future
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(5)
+
+
+def gated_fetch(value, calls):
+    """A fetch that blocks until its gate is set, recording each call."""
+    gate = threading.Event()
+
+    def fetch():
+        calls.append(value)
+        assert gate.wait(5)
+        return value
+
+    return fetch, gate
+
+
+def test_concurrent_misses_run_the_query_once():
+    cache = QueryCache()
+    calls = []
+    fetch, gate = gated_fetch("rows", calls)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = [pool.submit(cache.get_or_fetch, "SELECT 1", fetch) for _ in range(4)]
+        while cache.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        gate.set()
+        assert [result.result(5) for result in results] == ["rows"] * 4
+    assert calls == ["rows"]
+    assert cache.stats()["executed"] == 1
+    assert cache.get_or_fetch("SELECT  1;", lambda: "other") == "rows"
+
+
+def test_waiters_get_the_leaders_exception_and_nothing_is_cached():
+    cache = QueryCache()
+    started, gate = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        assert gate.wait(5)
+        raise RuntimeError("boom")
+
+    executor = ThreadExecutor()
+    leader = cache.submit("SELECT 1", failing, executor)
+    assert started.wait(5)
+    waiter = cache.submit("SELECT 1", failing, executor)
+    gate.set()
+    for future in (leader, waiter):
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result(5)
+    executor.join()
+    assert executor.submitted == 1
+    assert cache.get(QueryCache.make_key("SELECT 1")) == (False, None)
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_joining_a_fetch_takes_no_executor_thread():
+    cache = QueryCache()
+    calls = []
+    fetch, gate = gated_fetch("rows", calls)
+    executor = ThreadExecutor()
+    futures = [cache.submit("SELECT 1", fetch, executor) for _ in range(10)]
+    assert executor.submitted == 1
+    assert all(future is futures[0] for future in futures)
+    gate.set()
+    assert futures[-1].result(5) == "rows"
+    executor.join()
+
+    # A hit is answered without an executor at all
+    hit = cache.submit("SELECT 1", fetch, executor)
+    assert hit.done() and hit.result() == "rows"
+    assert executor.submitted == 1 and calls == ["rows"]
+
+
+def test_a_fetch_that_straddles_clear_is_not_cached():
+    cache = QueryCache()
+    calls = []
+    fetch, gate = gated_fetch("stale", calls)
+    executor = ThreadExecutor()
+    stale = cache.submit("SELECT 1", fetch, executor)
+    while not calls:
+        time.sleep(0.01)
+    cache.clear()
+    # After a refresh, the same query starts a fresh fetch instead of joining the old one
+    fresh = cache.submit("SELECT 1", lambda: "fresh", executor)
+    assert fresh.result(5) == "fresh"
+    gate.set()
+    assert stale.result(5) == "stale"
+    executor.join()
+    assert cache.get(QueryCache.make_key("SELECT 1")) == (True, "fresh")
+
+
+def test_clear_during_fetch_drops_the_result():
+    cache = QueryCache()
+
+    def fetch():
+        cache.clear()
+        return "stale"
+
+    assert cache.get_or_fetch("SELECT 1", fetch) == "stale"
+    assert len(cache) == 0
+
+
+def test_contains_has_no_side_effects():
+    cache = QueryCache(max_entries=2)
+    first, second = QueryCache.make_key("SELECT 1"), QueryCache.make_key("SELECT 2")
+    cache.set(first, "a")
+    cache.set(second, "b")
+    before = cache.stats()
+    assert cache.contains(first) and not cache.contains(QueryCache.make_key("SELECT 3"))
+    assert cache.stats() == before
+    # first stays least recently used, so it is the one evicted
+    cache.set(QueryCache.make_key("SELECT 3"), "c")
+    assert not cache.contains(first) and cache.contains(second)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the cache's monotonic clock with one the test advances by hand."""
+    now = [1000.0]
+    monkeypatch.setattr("utils.query_cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = QueryCache(default_ttl=60)
+    key = QueryCache.make_key("SELECT 1")
+    cache.set(key, "a")
+    cache.set(QueryCache.make_key("SELECT 2"), "b", ttl=600)
+    clock[0] += 60
+    assert cache.get(key) == (True, "a")
+    clock[0] += 1
+    assert cache.get(key) == (False, None)
+    assert not cache.contains(key)
+    assert cache.get(QueryCache.make_key("SELECT 2")) == (True, "b")
+    # The expired entry is dropped, and the next get_or_fetch runs the query again
+    assert len(cache) == 1
+    assert cache.get_or_fetch("SELECT 1", lambda: "fresh") == "fresh"
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = QueryCache(max_entries=2)
+    for query, value in [("SELECT 1", "a"), ("SELECT 2", "b")]:
+        cache.get_or_fetch(query, lambda value=value: value)
+    # Reading SELECT 1 makes SELECT 2 the least recently used
+    assert cache.get(QueryCache.make_key("SELECT 1")) == (True, "a")
+    cache.get_or_fetch("SELECT 3", lambda: "c")
+    assert len(cache) == 2
+    assert cache.get(QueryCache.make_key("SELECT 2")) == (False, None)
+    assert cache.get(QueryCache.make_key("SELECT 1")) == (True, "a")
+    assert cache.get(QueryCache.make_key("SELECT 3")) == (True, "c")
+
+
+def test_keys_normalize_sql_and_include_params():
+    assert QueryCache.make_key("SELECT  1\n;") == QueryCache.make_key("SELECT 1")
+    assert QueryCache.make_key("SELECT :id", {"id": 1}) != QueryCache.make_key("SELECT :id", {"id": 2})
+    assert (QueryCache.make_key("SELECT :a, :b", {"a": 1, "b": 2})
+            == QueryCache.make_key("SELECT :a, :b", {"b": 2, "a": 1}))
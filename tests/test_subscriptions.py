@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.subscriptions import build_sunburst_data
+
+
+def legacy_sunburst_data(df):
+    """The sunburst data as app.py used to build it from the raw user/subscription join."""
+    df = df.copy()
+    df['status'] = df['subscription_plan_id'].apply(lambda x: 'Subscribed' if pd.notna(x) else 'Unsubscribed')
+
+    subscribed_counts = df[df['status'] == 'Subscribed'].groupby('subscription_name').size().reset_index(name='values')
+    subscribed_counts['parent'] = 'Subscribed'
+    subscribed_counts.rename(columns={'subscription_name': 'label'}, inplace=True)
+
+    unsubscribed_count = len(df[df['status'] == 'Unsubscribed'])
+    unsubscribed_entry = pd.DataFrame({'label': ['Unsubscribed'], 'parent': ['All Users'], 'values': [unsubscribed_count]})
+    subscribed_entry = pd.DataFrame({'label': ['Subscribed'], 'parent': ['All Users'],
+                                     'values': [subscribed_counts['values'].sum()]})
+    root = pd.DataFrame({'label': ['All Users'], 'parent': [''], 'values': [df.shape[0]]})
+
+    sunburst_data = pd.concat([root, subscribed_entry, subscribed_counts, unsubscribed_entry], ignore_index=True)
+    total_value = sunburst_data.iloc[0]['values']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sunburst_data['percentage'] = [(value / total_value) * 100 for value in sunburst_data['values']]
+    return sunburst_data
+
+
+def grouping_sets(df):
+    """What SUBSCRIPTION_STATUS_QUERY returns for the same join: one row per (status, name) plus the total."""
+    joined = pd.DataFrame({
+        'status': np.where(df['subscription_plan_id'].notna(), 'Subscribed', 'Unsubscribed'),
+        'subscription_name': df['subscription_name'],
+    })
+    groups = joined.groupby(['status', 'subscription_name'], dropna=False).size().reset_index(name='users')
+    groups['is_total'] = False
+    total = pd.DataFrame({'status': [None], 'subscription_name': [None], 'is_total': [True], 'users': [len(joined)]})
+    return pd.concat([groups, total], ignore_index=True)[['status', 'subscription_name', 'is_total', 'users']]
+
+
+def join_frame(rows):
+    return pd.DataFrame(rows, columns=['user_id', 'subscription_plan_id', 'subscription_name'])
+
+
+def assert_same_sunburst(actual, expected):
+    pd.testing.assert_frame_equal(actual[['label', 'parent', 'values', 'percentage']].reset_index(drop=True),
+                                  expected[['label', 'parent', 'values', 'percentage']], check_dtype=False)
+
+
+def test_matches_legacy_pipeline():
+    df = join_frame([
+        (1, 2, 'Pro'), (2, 1, 'Basic'), (3, None, None), (4, 2, 'Pro'),
+        # A user with two transactions counts once per transaction
+        (5, 1, 'Basic'), (5, 2, 'Pro'),
+        (6, None, None),
+        # A plan without a name is subscribed but has no slice of its own
+        (7, 3, None),
+    ])
+    expected = legacy_sunburst_data(df)
+    actual = build_sunburst_data(grouping_sets(df))
+    assert_same_sunburst(actual, expected)
+    assert actual['label'].tolist() == ['All Users', 'Subscribed', 'Basic', 'Pro', 'Unsubscribed']
+    assert actual['values'].tolist() == [8, 5, 2, 3, 2]
+
+
+def test_all_unsubscribed():
+    df = join_frame([(1, None, None), (2, None, None), (3, None, None)])
+    actual = build_sunburst_data(grouping_sets(df))
+    assert_same_sunburst(actual, legacy_sunburst_data(df))
+    assert actual['values'].tolist() == [3, 0, 3]
+
+
+def test_empty():
+    df = join_frame([])
+    expected = legacy_sunburst_data(df)
+    actual = build_sunburst_data(grouping_sets(df))
+    # The old pipeline divided by a zero total; the percentages are 0 now rather than NaN
+    assert expected['percentage'].isna().all()
+    assert actual['percentage'].tolist() == pytest.approx([0.0, 0.0, 0.0])
+    assert_same_sunburst(actual.assign(percentage=np.nan), expected)
@@ -0,0 +1,49 @@
+from psycopg2 import sql
+
+from utils.sync import IncrementalSync
+
+
+def render(composable):
+    """Spell out a psycopg2 sql composition without a connection, quoting identifiers naively."""
+    if isinstance(composable, sql.Composed):
+        return "".join(render(part) for part in composable.seq)
+    if isinstance(composable, sql.Identifier):
+        return ".".join(f'"{name}"' for name in composable.strings)
+    if isinstance(composable, sql.SQL):
+        return composable.string
+    return str(composable)
+
+
+class FakeDestination:
+    def __init__(self):
+        self.queries = []
+        self.cursor = type("Cursor", (), {"rowcount": 2})()
+
+    def execute_query(self, query, params=None):
+        self.queries.append((render(query), params))
+
+    def commit(self):
+        pass
+
+
+def plan(lower, upper, soft_delete_column="deleted_at"):
+    return {"table": "file_management_userfile", "watermark_column": "updated_at", "lower": lower,
+            "upper": upper, "soft_delete_column": soft_delete_column}
+
+
+def test_soft_deletes_are_limited_to_the_copied_window():
+    destination = FakeDestination()
+    sync = IncrementalSync(None, destination)
+    assert sync.remove_soft_deleted(plan("2025-01-01 00:00:00", "2025-01-02 00:00:00")) == 2
+    query, params = destination.queries[0]
+    assert query == ('DELETE FROM "file_management_userfile" WHERE "deleted_at" IS NOT NULL '
+                     'AND "updated_at" >= %(lower)s AND "updated_at" <= %(upper)s')
+    assert params == {"lower": "2025-01-01 00:00:00", "upper": "2025-01-02 00:00:00"}
+
+
+def test_first_sync_checks_every_copied_row():
+    destination = FakeDestination()
+    IncrementalSync(None, destination).remove_soft_deleted(plan(None, "2025-01-02", "is_deleted"))
+    query, params = destination.queries[0]
+    assert query.endswith('WHERE "is_deleted" AND "updated_at" <= %(upper)s')
+    assert params == {"upper": "2025-01-02"}
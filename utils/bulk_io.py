@@ -0,0 +1,70 @@
+import io
+import json
+from datetime import date, datetime, time
+from itertools import islice
+
+from psycopg2 import sql
+
+
+def table_identifier(table_name):
+    """sql.Identifier for a table name that may be schema-qualified."""
+    return sql.Identifier(*table_name.split('.'))
+
+
+def batched(rows, batch_size):
+    """Yield lists of at most batch_size rows from any iterable."""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def csv_field(value):
+    """Render a value for COPY ... (FORMAT csv): NULL stays unquoted and empty, everything else is quoted."""
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date, time)):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def dataframe_rows(df):
+    """Iterate a DataFrame as plain tuples with missing values turned into None.
+
+    convert_dtypes keeps integer columns that hold NaN from being written as floats ("1.0").
+    """
+    df = df.convert_dtypes()
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+class CopyRowStream(io.TextIOBase):
+    """File-like object that renders rows as CSV lazily, so COPY FROM STDIN never holds the whole batch as text."""
+
+    def __init__(self, rows):
+        self._lines = (','.join(csv_field(value) for value in row) + '\n' for row in rows)
+        self._buffer = ''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
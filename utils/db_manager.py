@@ -1,15 +1,36 @@
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
+import uuid
+import pandas as pd
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from utils.bulk_io import CopyRowStream, batched, dataframe_rows, table_identifier
+from utils.db_pool import get_connection_pool
+from utils.fast_read import read_copy
+from utils.indexes import DASHBOARD_INDEXES, MIN_SEQ_SCAN_ROWS, seq_scans
+from utils.map_views import MAP_VIEWS
+from utils.rollups import CREATE_ROLLUP_TABLES, ROLLUP_SOURCES, ROLLUP_TABLE, WATERMARK_TABLE
+from utils.sync import WATERMARK_LOOKBACK
+
+
 class DatabaseManager:
-    def __init__(self, db_config):
+    def __init__(self, db_config, pool_size=None):
         self.db_config = db_config
         self.connection = None
         self.cursor = None
+        # With pool_size set, connections are borrowed from a process-wide psycopg2 pool
+        self.pool = get_connection_pool(db_config, maxconn=pool_size) if pool_size else None
 
     def connect(self):
         """Establish a connection to the database."""
+        if self.pool:
+            self.connection = self.pool.getconn()
+            self.cursor = self.connection.cursor()
+            return self
         try:
             self.connection = psycopg2.connect(
                 host=self.db_config['DB_HOST'],
@@ -44,12 +65,33 @@ class DatabaseManager:
             raise
 
     def disconnect(self):
-        """Close the database connection."""
+        """Close the database connection, or return it to the pool."""
         if self.cursor:
             self.cursor.close()
-        if self.connection:
+        if self.connection and self.pool:
+            self.pool.putconn(self.connection)
+        elif self.connection:
             self.connection.close()
             print("Database connection closed.")
+        self.connection = None
+        self.cursor = None
+
+    @contextmanager
+    def checkout(self):
+        """Hold a connection for the block, committing on success and rolling back on error."""
+        self.connect()
+        try:
+            yield self
+            self.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            self.disconnect()
+
+    def pool_status(self):
+        """Checked-out count and wait statistics of the backing pool, if pooled."""
+        return self.pool.status() if self.pool else None
 
     def execute_query(self, query, params=None):
         """Execute a SQL query with optional parameters."""
@@ -63,6 +105,62 @@ class DatabaseManager:
         """Fetch all results from the last executed query."""
         return self.cursor.fetchall()
 
+    def stream_query(self, query, params=None, itersize=10000, chunksize=None, as_dataframe=False):
+        """Yield the results of a query through a named (server-side) cursor so memory stays flat.
+
+        Rows are fetched itersize at a time. With chunksize, lists of that many rows are yielded
+        instead, or DataFrames when as_dataframe is set.
+        """
+        # Named cursors need WITH HOLD to survive outside a transaction block
+        cursor = self.connection.cursor(name=f"stream_{uuid.uuid4().hex}", withhold=self.connection.autocommit)
+        cursor.itersize = itersize
+        try:
+            cursor.execute(query, params)
+            if not chunksize:
+                yield from cursor
+                return
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                if as_dataframe:
+                    yield pd.DataFrame(rows, columns=[column[0] for column in cursor.description])
+                else:
+                    yield rows
+        except Exception as e:
+            print(f"Error streaming query: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def read_frame(self, query, params=None, dtype_backend=None):
+        """Read a query's full result into a DataFrame through COPY TO STDOUT.
+
+        Falls back to a plain fetch when a column's type isn't supported by the COPY reader.
+        """
+        try:
+            with self.connection.cursor() as cursor:
+                df = read_copy(cursor, query, params, dtype_backend)
+                if df is not None:
+                    return df
+                cursor.execute(query, params)
+                return pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+        except Exception as e:
+            print(f"Error reading query: {e}")
+            raise
+
+    def stream_table(self, table_name, columns, where=None, params=None, itersize=10000):
+        """Stream rows of the given columns, ready to pipe into another manager's copy_rows:
+
+            target.copy_rows(table, columns, source.stream_table(table, columns))
+        """
+        query = sql.SQL("SELECT {} FROM {}").format(
+            sql.SQL(', ').join(map(sql.Identifier, columns)), table_identifier(table_name))
+        if where:
+            where = where if isinstance(where, sql.Composable) else sql.SQL(where)
+            query = sql.SQL("{} WHERE {}").format(query, where)
+        return self.stream_query(query, params, itersize=itersize)
+
     def commit(self):
         """Commit the current transaction."""
         self.connection.commit()
@@ -70,3 +168,244 @@ class DatabaseManager:
     def create_table(self, create_table_sql):
         """Create a table in the database."""
         self.execute_query(create_table_sql)
+
+    def copy_rows(self, table_name, columns, rows, batch_size=100000, conflict_columns=None, update_columns=None):
+        """Bulk load an iterable of row tuples with COPY FROM STDIN, committing after every batch.
+
+        With conflict_columns, each batch is copied into a temporary staging table and upserted:
+        update_columns (default: every other column) are overwritten, and an empty list skips
+        conflicting rows instead. Returns the number of rows loaded.
+        """
+        total = 0
+        for batch in batched(rows, batch_size):
+            if conflict_columns:
+                self._upsert_from_staging(
+                    table_name, columns, conflict_columns, update_columns,
+                    lambda staging: self._copy(staging, columns, CopyRowStream(batch)))
+            else:
+                self._copy(table_identifier(table_name), columns, CopyRowStream(batch))
+            self.commit()
+            total += len(batch)
+            print(f"Copied {total} rows into {table_name}")
+        return total
+
+    def copy_dataframe(self, table_name, df, batch_size=100000, conflict_columns=None, update_columns=None):
+        """Bulk load a DataFrame whose columns match the table's; missing values load as NULL."""
+        return self.copy_rows(table_name, list(df.columns), dataframe_rows(df), batch_size=batch_size,
+                              conflict_columns=conflict_columns, update_columns=update_columns)
+
+    def copy_csv(self, table_name, csv_buffer, columns=None, header=True, conflict_columns=None,
+                 update_columns=None):
+        """Stream an open CSV file or buffer straight into the table with a single COPY."""
+        if conflict_columns:
+            if not columns:
+                raise ValueError("columns are required to upsert from CSV")
+            self._upsert_from_staging(
+                table_name, columns, conflict_columns, update_columns,
+                lambda staging: self._copy(staging, columns, csv_buffer, header=header))
+        else:
+            self._copy(table_identifier(table_name), columns, csv_buffer, header=header)
+        self.commit()
+
+    def insert_rows(self, table_name, columns, rows, batch_size=1000, conflict_columns=None, update_columns=None):
+        """Batched multi-row INSERT through execute_values, for connections where COPY isn't available."""
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s{}").format(
+            table_identifier(table_name),
+            sql.SQL(', ').join(map(sql.Identifier, columns)),
+            self._conflict_clause(columns, conflict_columns, update_columns),
+        )
+        total = 0
+        for batch in batched(rows, batch_size):
+            try:
+                execute_values(self.cursor, query, batch, page_size=batch_size)
+            except Exception as e:
+                print(f"Error inserting into {table_name}: {e}")
+                raise
+            self.commit()
+            total += len(batch)
+            print(f"Inserted {total} rows into {table_name}")
+        return total
+
+    def _copy(self, target, columns, stream, header=False):
+        """COPY a CSV stream into target, an sql.Identifier."""
+        column_list = sql.SQL(" ({})").format(sql.SQL(', ').join(map(sql.Identifier, columns))) if columns else sql.SQL('')
+        query = sql.SQL("COPY {}{} FROM STDIN WITH (FORMAT csv{})").format(
+            target, column_list, sql.SQL(", HEADER true" if header else ""))
+        try:
+            self.cursor.copy_expert(query, stream)
+        except Exception as e:
+            print(f"Error copying into {target.strings[-1]}: {e}")
+            raise
+
+    def _upsert_from_staging(self, table_name, columns, conflict_columns, update_columns, load):
+        """Load rows into a temporary copy of the table, then merge them with INSERT ... ON CONFLICT."""
+        target = table_identifier(table_name)
+        staging = sql.Identifier(f"{table_name.split('.')[-1]}_staging")
+        self.execute_query(sql.SQL("CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP").format(
+            staging, target))
+        load(staging)
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        self.execute_query(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}{}").format(
+            target, column_list, column_list, staging,
+            self._conflict_clause(columns, conflict_columns, update_columns)))
+
+    @staticmethod
+    def _conflict_clause(columns, conflict_columns, update_columns):
+        """ON CONFLICT clause for an upsert, or nothing for a plain insert."""
+        if not conflict_columns:
+            return sql.SQL('')
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in conflict_columns]
+        conflict = sql.SQL(', ').join(map(sql.Identifier, conflict_columns))
+        if not update_columns:
+            return sql.SQL(" ON CONFLICT ({}) DO NOTHING").format(conflict)
+        assignments = sql.SQL(', ').join(
+            sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(column), sql.Identifier(column))
+            for column in update_columns)
+        return sql.SQL(" ON CONFLICT ({}) DO UPDATE SET {}").format(conflict, assignments)
+
+    def ensure_rollup_tables(self):
+        """Create the daily rollup and watermark tables if they don't exist."""
+        self.execute_query(CREATE_ROLLUP_TABLES)
+        self.commit()
+
+    def refresh_rollups(self, sources=ROLLUP_SOURCES, rebuild=False, lookback=WATERMARK_LOOKBACK):
+        """Recount the days from each rollup's watermark onwards in the daily rollup table.
+
+        Whole days are deleted and counted again, starting lookback before the watermark's day, so rows
+        that reach this database late with an earlier created_at (the sync re-reads the same window)
+        are counted instead of missed. Pass rebuild=True to recount a rollup from scratch.
+        """
+        self.ensure_rollup_tables()
+        for source_table, dimensions in sources.items():
+            self.execute_query(sql.SQL("SELECT MAX(created_at) FROM {}").format(sql.Identifier(source_table)))
+            upper = self.cursor.fetchone()[0]
+            if upper is None:
+                continue
+
+            for dimension, (value_expression, joins) in dimensions.items():
+                key = (source_table, dimension)
+                if rebuild:
+                    self.execute_query(
+                        f"DELETE FROM {ROLLUP_TABLE} WHERE source_table = %s AND dimension = %s", key)
+                    self.execute_query(
+                        f"DELETE FROM {WATERMARK_TABLE} WHERE source_table = %s AND dimension = %s", key)
+
+                self.execute_query(
+                    f"""SELECT (watermark - %s::interval)::date FROM {WATERMARK_TABLE}
+                        WHERE source_table = %s AND dimension = %s""", (lookback, *key))
+                row = self.cursor.fetchone()
+                first_day = row[0] if row else '-infinity'
+
+                self.execute_query(
+                    f"DELETE FROM {ROLLUP_TABLE} WHERE source_table = %s AND dimension = %s AND day >= %s",
+                    (*key, first_day))
+                query = sql.SQL("""
+                    INSERT INTO {rollup} (source_table, dimension, dimension_value, day, count)
+                    SELECT %(source_table)s, %(dimension)s, COALESCE(({value})::text, ''), s.created_at::date, COUNT(*)
+                    FROM {source} s {joins}
+                    WHERE s.created_at >= %(first_day)s::date AND s.created_at <= %(upper)s
+                    GROUP BY 3, 4
+                """).format(
+                    rollup=sql.Identifier(ROLLUP_TABLE),
+                    source=sql.Identifier(source_table),
+                    value=sql.SQL(value_expression),
+                    joins=sql.SQL(joins),
+                )
+                self.execute_query(query, {"source_table": source_table, "dimension": dimension,
+                                           "first_day": first_day, "upper": upper})
+                self.execute_query(
+                    f"""INSERT INTO {WATERMARK_TABLE} (source_table, dimension, watermark) VALUES (%s, %s, %s)
+                        ON CONFLICT (source_table, dimension)
+                        DO UPDATE SET watermark = EXCLUDED.watermark, updated_at = NOW()""",
+                    (source_table, dimension, upper))
+                self.commit()
+                print(f"Rolled up {source_table}.{dimension} through {upper}")
+
+    def missing_summaries(self, views=MAP_VIEWS):
+        """Names of the rollup tables and map metric views the dashboard reads that don't exist yet."""
+        names = [ROLLUP_TABLE, WATERMARK_TABLE, *(view for view, _, _, _ in views.values())]
+        self.execute_query("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p', 'm') AND relname = ANY(%s)",
+                           (names,))
+        existing = {row[0] for row in self.cursor.fetchall()}
+        self.commit()
+        return [name for name in names if name not in existing]
+
+    def refresh_map_views(self, views=MAP_VIEWS):
+        """Create any missing map metric views and refresh them without blocking readers.
+
+        REFRESH ... CONCURRENTLY needs a unique index on the view, which is created alongside it.
+        """
+        for view, key_column, _, definition in views.values():
+            self.execute_query(sql.SQL("CREATE MATERIALIZED VIEW IF NOT EXISTS {} AS {}").format(
+                sql.Identifier(view), sql.SQL(definition)))
+            self.execute_query(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                sql.Identifier(f"{view}_key"), sql.Identifier(view), sql.Identifier(key_column)))
+            self.execute_query(sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view)))
+            self.commit()
+            print(f"Refreshed {view}")
+
+    def ensure_indexes(self, indexes=DASHBOARD_INDEXES):
+        """Create the missing indexes with CREATE INDEX CONCURRENTLY, so the tables stay writable meanwhile.
+
+        CONCURRENTLY can't run inside a transaction block, so the connection is in autocommit for the
+        duration. A concurrent build that failed leaves an invalid index behind; those are dropped and
+        rebuilt. Indexes on tables this database doesn't have are skipped. Returns the names created.
+        """
+        self.execute_query("SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                           "WHERE c.relname = ANY(%s)", (list(indexes),))
+        existing = dict(self.cursor.fetchall())
+        self.execute_query("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND relname = ANY(%s)",
+                           (list({index["table"] for index in indexes.values()}),))
+        tables = {row[0] for row in self.cursor.fetchall()}
+        self.commit()
+
+        created = []
+        autocommit = self.connection.autocommit
+        self.connection.autocommit = True
+        try:
+            for name, index in indexes.items():
+                if index["table"] not in tables or existing.get(name):
+                    continue
+                if name in existing:
+                    self.execute_query(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(name)))
+                include = index.get("include")
+                self.execute_query(sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({}){}{}").format(
+                    sql.Identifier(name),
+                    sql.Identifier(index["table"]),
+                    sql.SQL(", ").join(map(sql.SQL, index["columns"])),
+                    sql.SQL(" INCLUDE ({})").format(sql.SQL(", ").join(map(sql.Identifier, include)))
+                    if include else sql.SQL(""),
+                    sql.SQL(" WHERE {}").format(sql.SQL(index["where"])) if index.get("where") else sql.SQL(""),
+                ))
+                created.append(name)
+                print(f"Created index {name}")
+        finally:
+            self.connection.autocommit = autocommit
+        return created
+
+    def seq_scan_report(self, queries, min_rows=MIN_SEQ_SCAN_ROWS):
+        """EXPLAIN each query and list the ones whose plan still sequentially scans a large table.
+
+        queries is a {panel: {key: sql or (sql, params)}} mapping as returned by utils.panels.panel_queries,
+        with SQLAlchemy-style :name binds. Plans are only estimated, nothing is executed. Returns one row
+        per (panel, query, table), largest table first.
+        """
+        self.execute_query("SELECT relname, reltuples::bigint FROM pg_class WHERE relkind IN ('r', 'p', 'm')")
+        table_rows = dict(self.cursor.fetchall())
+        dialect = postgresql.psycopg2.dialect()
+
+        found = set()
+        for panel, panel_queries in queries.items():
+            for key, query in panel_queries.items():
+                query, params = query if isinstance(query, tuple) else (query, None)
+                # Compiling turns :name binds into %(name)s and escapes literal % signs, hence params or {}
+                self.execute_query("EXPLAIN (FORMAT JSON) " + str(text(query).compile(dialect=dialect)),
+                                   params or {})
+                plan = self.cursor.fetchone()[0][0]["Plan"]
+                for table, _ in seq_scans(plan):
+                    if table_rows.get(table, 0) >= min_rows:
+                        found.add((panel, key, table, table_rows[table]))
+        self.commit()
+        return pd.DataFrame(sorted(found, key=lambda row: (-row[3], row[0], row[1])),
+                            columns=["panel", "query", "table", "table_rows"])
@@ -0,0 +1,142 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import pool as pg_pool
+from sqlalchemy import create_engine
+
+# Defaults sized for a handful of concurrent Streamlit sessions against one Postgres
+ENGINE_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
+_engines = {}
+_pools = {}
+_lock = threading.Lock()
+
+
+class PoolMetrics:
+    """Counters for connection checkouts and the time spent waiting for one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": self.total_wait / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+def get_engine(connection_string, **options):
+    """Return the process-wide SQLAlchemy engine for connection_string, creating it on first use."""
+    with _lock:
+        engine = _engines.get(connection_string)
+        if engine is None:
+            engine = create_engine(connection_string, **{**ENGINE_OPTIONS, **options})
+            engine.pool_metrics = PoolMetrics()
+            _engines[connection_string] = engine
+        return engine
+
+
+@contextmanager
+def connect(engine):
+    """Check out a connection from the engine's pool, recording how long the checkout waited."""
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        engine.pool_metrics.record_wait(time.perf_counter() - start)
+        yield conn
+
+
+class BlockingConnectionPool:
+    """psycopg2 ThreadedConnectionPool that waits for a free connection instead of raising when exhausted."""
+
+    def __init__(self, minconn, maxconn, **connect_kwargs):
+        self.maxconn = maxconn
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._checked_out = 0
+        self._lock = threading.Lock()
+        self.metrics = PoolMetrics()
+
+    def getconn(self, timeout=None):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            raise pg_pool.PoolError(f"No connection available within {timeout}s")
+        try:
+            connection = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        with self._lock:
+            self._checked_out += 1
+        return connection
+
+    def putconn(self, connection, close=False):
+        self._pool.putconn(connection, close=close)
+        with self._lock:
+            self._checked_out -= 1
+        self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def status(self):
+        with self._lock:
+            checked_out = self._checked_out
+        return {"size": self.maxconn, "checked_out": checked_out, **self.metrics.snapshot()}
+
+
+def get_connection_pool(db_config, minconn=1, maxconn=10):
+    """Return the process-wide psycopg2 pool for db_config, creating it on first use."""
+    key = (db_config['DB_HOST'], db_config['DB_PORT'], db_config['DB_NAME'], db_config['DB_USER'])
+    with _lock:
+        connection_pool = _pools.get(key)
+        if connection_pool is None:
+            connection_pool = BlockingConnectionPool(
+                minconn, maxconn,
+                host=db_config['DB_HOST'],
+                database=db_config['DB_NAME'],
+                user=db_config['DB_USER'],
+                password=db_config['DB_PASS'],
+                port=db_config['DB_PORT'],
+            )
+            _pools[key] = connection_pool
+        return connection_pool
+
+
+def engine_status(engine):
+    """Current pool occupancy and checkout wait statistics for an engine."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **engine.pool_metrics.snapshot(),
+    }
+
+
+def pool_status():
+    """Status of every engine and psycopg2 pool created in this process, for monitoring."""
+    with _lock:
+        engines = dict(_engines)
+        pools = dict(_pools)
+    status = {f"engine:{engine.url.host}/{engine.url.database}": engine_status(engine) for engine in engines.values()}
+    status.update({f"psycopg2:{key[0]}/{key[2]}": connection_pool.status() for key, connection_pool in pools.items()})
+    return status
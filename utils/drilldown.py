@@ -0,0 +1,55 @@
+# Days shown in the per-user activity chart, ending today
+DRILLDOWN_DAYS = 30
+
+# One row per day of the window, zero-filled, so the frame can be plotted as is.
+# Bound through SQLAlchemy, hence the :user_id / :days style.
+USER_ACTIVITY_QUERY = """
+WITH days AS (
+    SELECT generate_series(CURRENT_DATE - (:days - 1), CURRENT_DATE, INTERVAL '1 day')::date AS day
+),
+views AS (
+    SELECT v.created_at::date AS day, COUNT(*) AS views
+    FROM public.file_management_fileviewstransaction v
+    JOIN public.file_management_userfile f ON v.file_id = f.id
+    WHERE f.user_id = :user_id AND v.created_at >= CURRENT_DATE - (:days - 1)
+    GROUP BY 1
+),
+uploads AS (
+    SELECT f.created_at::date AS day, COUNT(*) AS uploads
+    FROM public.file_management_userfile f
+    WHERE f.user_id = :user_id AND f.created_at >= CURRENT_DATE - (:days - 1)
+    GROUP BY 1
+)
+SELECT d.day AS date, COALESCE(v.views, 0) AS views, COALESCE(u.uploads, 0) AS uploads
+FROM days d
+LEFT JOIN views v ON v.day = d.day
+LEFT JOIN uploads u ON u.day = d.day
+ORDER BY d.day
+"""
+
+USER_DOWNLOADS_QUERY = """
+SELECT dt.country_name, COUNT(DISTINCT dt.id) AS downloads
+FROM public.file_management_filedownloadtransaction dt
+JOIN public.file_management_userfile uf ON dt.file_id = uf.id
+WHERE uf.user_id = :user_id
+GROUP BY 1
+"""
+
+
+# Largest id a BIGINT column holds; bigger numbers would fail in the query instead of warning
+MAX_USER_ID = 2 ** 63 - 1
+
+
+def parse_user_id(value):
+    """The user id typed into the drilldown as an int, or None if it isn't a positive whole number."""
+    value = value.strip()
+    # isdecimal, not isdigit: digits like '²' pass isdigit but int() rejects them
+    return int(value) if value.isdecimal() and 0 < int(value) <= MAX_USER_ID else None
+
+
+def drilldown_queries(user_id, days=DRILLDOWN_DAYS):
+    """Queries of both drilldown panels, in the {panel: {key: (sql, params)}} shape PanelScheduler.add takes."""
+    return {
+        "user_activity": {"activity": (USER_ACTIVITY_QUERY, {"user_id": user_id, "days": days})},
+        "user_downloads": {"downloads": (USER_DOWNLOADS_QUERY, {"user_id": user_id})},
+    }
@@ -0,0 +1,134 @@
+import io
+
+import pandas as pd
+import psycopg2.extensions
+from psycopg2 import sql
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+# Postgres type OID -> how the column travels through COPY. Timestamps and dates are sent as integer
+# microseconds / days so they parse as numbers instead of locale- and time-zone-dependent text.
+COLUMN_KINDS = {
+    16: "bool",
+    20: "int", 21: "int", 23: "int", 26: "int",
+    700: "float", 701: "float", 1700: "float",
+    19: "text", 25: "text", 1042: "text", 1043: "text", 2950: "text",
+    1082: "date",
+    1114: "timestamp",
+    1184: "timestamptz",
+}
+
+COPY_EXPRESSIONS = {
+    "date": "({} - DATE '1970-01-01')",
+    "timestamp": "(EXTRACT(EPOCH FROM {}) * 1000000)::bigint",
+    "timestamptz": "(EXTRACT(EPOCH FROM {}) * 1000000)::bigint",
+}
+
+ARROW_TYPES = {"bool": "bool_", "int": "int64", "float": "float64", "text": "string",
+               "date": "int32", "timestamp": "int64", "timestamptz": "int64"}
+PANDAS_TYPES = {"bool": "boolean", "int": "Int64", "float": "float64", "text": "str",
+                "date": "Int64", "timestamp": "Int64", "timestamptz": "Int64"}
+
+
+def describe(cursor, query):
+    """(name, kind) per result column, or None if a column's type or a duplicate name rules COPY out."""
+    cursor.execute(f"SELECT * FROM ({query}) AS q LIMIT 0")
+    columns = [(column.name, COLUMN_KINDS.get(column.type_code)) for column in cursor.description]
+    names = [name for name, _ in columns]
+    if len(set(names)) != len(names) or any(kind is None for _, kind in columns):
+        return None
+    return columns
+
+
+def _parse_arrow(buffer, columns, dtype_backend):
+    names = [name for name, _ in columns]
+    column_types = {name: getattr(pa, ARROW_TYPES[kind])() for name, kind in columns}
+    if buffer.getbuffer().nbytes == 0:
+        # read_csv rejects an empty input, so build the zero-row table from the probed types
+        table = pa.table({name: pa.array([], type=column_types[name]) for name in names})
+    else:
+        table = pa_csv.read_csv(
+            buffer,
+            read_options=pa_csv.ReadOptions(column_names=names),
+            convert_options=pa_csv.ConvertOptions(
+                column_types=column_types,
+                true_values=["t"], false_values=["f"], null_values=[""],
+                strings_can_be_null=True, quoted_strings_can_be_null=False,
+            ),
+        )
+    for i, (name, kind) in enumerate(columns):
+        if kind == "date":
+            table = table.set_column(i, name, table.column(i).cast(pa.date32()))
+        elif kind in ("timestamp", "timestamptz"):
+            unit = pa.timestamp("us", tz="UTC" if kind == "timestamptz" else None)
+            table = table.set_column(i, name, table.column(i).cast(unit))
+    return table.to_pandas(date_as_object=False, types_mapper=pd.ArrowDtype if dtype_backend == "pyarrow" else None)
+
+
+def _parse_pandas(buffer, columns):
+    # Unlike pyarrow, read_csv can't tell a quoted empty string from NULL, so both come back as NaN
+    names = [name for name, _ in columns]
+    dtypes = {name: PANDAS_TYPES[kind] for name, kind in columns}
+    if buffer.getbuffer().nbytes == 0:
+        df = pd.DataFrame({name: pd.Series(dtype=dtypes[name]) for name in names})
+    else:
+        df = pd.read_csv(buffer, names=names, header=None, dtype=dtypes,
+                         true_values=["t"], false_values=["f"], keep_default_na=False, na_values=[""])
+    for name, kind in columns:
+        # Match Arrow's conversion: plain numpy columns unless nulls force float / object
+        if kind == "int":
+            df[name] = df[name].astype("float64" if df[name].hasnans else "int64")
+        elif kind == "bool":
+            df[name] = df[name].astype(object if df[name].hasnans else "bool")
+        elif kind == "date":
+            df[name] = pd.to_datetime(df[name], unit="D")
+        elif kind in ("timestamp", "timestamptz"):
+            df[name] = pd.to_datetime(df[name], unit="us", utc=kind == "timestamptz")
+    return df
+
+
+def read_copy(cursor, query, params=None, dtype_backend=None):
+    """Run a query through COPY (...) TO STDOUT on a psycopg2 cursor and parse it into a DataFrame.
+
+    Parsed with pyarrow when it is installed (dtype_backend='pyarrow' keeps Arrow-backed columns),
+    otherwise with pandas' C CSV parser. Returns None when the result has a column type COPY can't
+    round-trip here, so the caller can fall back to read_sql. params are bound as cursor.execute binds
+    them: without params the query is sent as is, so a literal % needs no escaping.
+    """
+    query = cursor.mogrify(query.strip().rstrip(';'), params).decode()
+    columns = describe(cursor, query)
+    if columns is None:
+        return None
+
+    select = sql.SQL(", ").join(
+        sql.SQL(COPY_EXPRESSIONS.get(kind, "{}")).format(sql.Identifier(name)) for name, kind in columns)
+    buffer = io.BytesIO()
+    cursor.copy_expert(sql.SQL("COPY (SELECT {} FROM ({}) AS q) TO STDOUT WITH (FORMAT csv)").format(
+        select, sql.SQL(query)), buffer)
+    buffer.seek(0)
+
+    if pa_csv is not None:
+        return _parse_arrow(buffer, columns, dtype_backend)
+    return _parse_pandas(buffer, columns)
+
+
+def read_sql_fast(conn, query, params=None, dtype_backend=None):
+    """Drop-in for pd.read_sql(text(query), conn, params=params) on a SQLAlchemy connection.
+
+    Uses read_copy when the driver is psycopg2 and every column type is supported, read_sql otherwise.
+    """
+    dbapi_connection = conn.connection.dbapi_connection
+    if isinstance(dbapi_connection, psycopg2.extensions.connection):
+        # Compiling turns :name binds into the driver's %(name)s style, escaping literal % signs
+        compiled = str(text(query).compile(dialect=conn.dialect))
+        with dbapi_connection.cursor() as cursor:
+            # Always a mapping: compiled SQL escapes literal % signs as %%, which only binding undoes
+            df = read_copy(cursor, compiled, params or {}, dtype_backend)
+        if df is not None:
+            return df
+    return pd.read_sql(text(query), conn, params=params)
@@ -0,0 +1,27 @@
+import os
+
+import toml
+from dotenv import load_dotenv
+
+
+def load_connection_string(secrets_path=".streamlit/secrets.toml"):
+    """Build the SQLAlchemy connection string from the Streamlit secrets file."""
+    db = toml.load(secrets_path)["database"]
+    return f"postgresql+psycopg2://{db['user']}:{db['password']}@{db['host']}:{db['port']}/{db['name']}"
+
+
+def db_config_from_secrets(section):
+    """Turn a Streamlit secrets section (user, password, host, port, name) into a DatabaseManager config."""
+    return {
+        "DB_HOST": section["host"],
+        "DB_NAME": section["name"],
+        "DB_USER": section["user"],
+        "DB_PASS": section["password"],
+        "DB_PORT": section["port"],
+    }
+
+
+def load_db_config(prefix="DB_"):
+    """Read a DatabaseManager config from <prefix>HOST, NAME, USER, PASS and PORT in the environment or .env."""
+    load_dotenv()
+    return {f"DB_{key}": os.environ[f"{prefix}{key}"] for key in ("HOST", "NAME", "USER", "PASS", "PORT")}
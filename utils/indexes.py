@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+# Indexes the dashboard's queries and the rollup refresh rely on, by name. "include" makes an index
+# covering (index-only scans), "where" makes it partial. Lookup tables with a handful of rows are left
+# to sequential scans.
+DASHBOARD_INDEXES = OrderedDict([
+    # Incremental rollup refresh: created_at > watermark on every rolled-up table
+    ("account_management_user_created_at_idx", {
+        "table": "account_management_user", "columns": ["created_at"]}),
+    ("account_management_referraltransaction_created_at_idx", {
+        "table": "account_management_referraltransaction", "columns": ["created_at"]}),
+    ("account_management_followerstransaction_created_at_idx", {
+        "table": "account_management_followerstransaction", "columns": ["created_at"]}),
+    ("file_management_userfile_created_at_idx", {
+        "table": "file_management_userfile", "columns": ["created_at"]}),
+    ("file_management_filedownloadtransaction_created_at_idx", {
+        "table": "file_management_filedownloadtransaction", "columns": ["created_at"]}),
+    ("file_management_fileviewstransaction_created_at_idx", {
+        "table": "file_management_fileviewstransaction", "columns": ["created_at"]}),
+    # Active-user KPIs
+    ("account_management_user_last_login_idx", {
+        "table": "account_management_user", "columns": ["last_login"], "include": ["id"]}),
+    # Subscribed KPI counts only active transactions
+    ("subscription_management_subscriptiontransaction_active_idx", {
+        "table": "subscription_management_subscriptiontransaction", "columns": ["id"],
+        "where": "status = 'ACTIVE'"}),
+    ("subscription_management_subscriptiontransaction_user_id_idx", {
+        "table": "subscription_management_subscriptiontransaction", "columns": ["user_id"],
+        "include": ["subscription_plan_id"]}),
+    # User drilldown: a user's files, then their views and downloads
+    ("file_management_userfile_user_id_created_at_idx", {
+        "table": "file_management_userfile", "columns": ["user_id", "created_at"]}),
+    ("file_management_userfile_category_id_idx", {
+        "table": "file_management_userfile", "columns": ["category_id_id"]}),
+    ("file_management_fileviewstransaction_file_id_created_at_idx", {
+        "table": "file_management_fileviewstransaction", "columns": ["file_id", "created_at"]}),
+    ("file_management_filedownloadtransaction_file_id_idx", {
+        "table": "file_management_filedownloadtransaction", "columns": ["file_id"],
+        "include": ["id", "country_name"]}),
+    # Wallet running totals and the balance map view
+    ("finance_management_userwallet_created_at_idx", {
+        "table": "finance_management_userwallet", "columns": ["created_at"],
+        "include": ["paid_balance", "total_balance"]}),
+    ("finance_management_userwallet_user_id_idx", {
+        "table": "finance_management_userwallet", "columns": ["user_id"]}),
+    # Payouts per withdraw method
+    ("finance_management_withdrawrequesttransaction_method_idx", {
+        "table": "finance_management_withdrawrequesttransaction", "columns": ["withdraw_method_id"],
+        "include": ["amount"]}),
+    # Latest earning rate per country (DISTINCT ON ... ORDER BY country_name, id DESC)
+    ("finance_management_countrywiseearning_country_id_idx", {
+        "table": "finance_management_countrywiseearning", "columns": ["country_name", "id DESC"]}),
+])
+
+# Sequential scans of tables estimated below this many rows are cheaper than an index and not reported
+MIN_SEQ_SCAN_ROWS = 10000
+
+
+def seq_scans(plan):
+    """Yield (relation, estimated rows) for every Seq Scan node of an EXPLAIN (FORMAT JSON) plan."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"], plan.get("Plan Rows", 0)
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
@@ -0,0 +1,174 @@
+import threading
+import uuid
+
+from utils.db_manager import DatabaseManager
+from utils.drilldown import drilldown_queries
+from utils.panels import panel_queries
+from utils.parallel_sync import ParallelSync
+from utils.rollups import ROLLUP_TABLE
+from utils.sync import SYNC_TABLES, IncrementalSync
+
+# Progress steps recorded once the missing indexes are built and the map metric views are refreshed
+INDEXES_STEP = "indexes"
+MAP_VIEWS_STEP = "map_views"
+
+# Session-level advisory lock so only one refresh runs against the database, across processes
+REFRESH_LOCK_KEY = 720_451
+
+CREATE_JOB_TABLES = """
+CREATE TABLE IF NOT EXISTS etl_refresh_jobs (
+    job_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS etl_refresh_progress (
+    job_id TEXT NOT NULL REFERENCES etl_refresh_jobs (job_id) ON DELETE CASCADE,
+    position INT NOT NULL,
+    step TEXT NOT NULL,
+    state TEXT NOT NULL,
+    rows_copied BIGINT,
+    rows_deleted BIGINT,
+    duration_seconds DOUBLE PRECISION,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (job_id, step)
+);
+"""
+
+# Read through SQLAlchemy by the dashboard, hence the :job_id bind style
+JOB_PROGRESS_QUERY = """
+SELECT j.state AS job_state, j.error, p.step, p.state, p.rows_copied, p.rows_deleted, p.duration_seconds
+FROM etl_refresh_jobs j
+JOIN etl_refresh_progress p ON p.job_id = j.job_id
+WHERE j.job_id = :job_id
+ORDER BY p.position
+"""
+
+
+def bootstrap_summaries(destination_config):
+    """Build the daily rollup and map metric views if the destination has never had them.
+
+    The dashboard's panels read only these, so a database last refreshed before they existed would
+    fail every panel until the next refresh. Holds the refresh lock while building, waiting for a
+    running refresh to finish first. Returns the names that had to be built.
+    """
+    destination = DatabaseManager(destination_config)
+    try:
+        destination.connect()
+        if not destination.missing_summaries():
+            return []
+        destination.execute_query("SELECT pg_advisory_lock(%s)", (REFRESH_LOCK_KEY,))
+        # A refresh that held the lock may have built them meanwhile
+        missing = destination.missing_summaries()
+        if missing:
+            destination.refresh_rollups()
+            destination.refresh_map_views()
+        return missing
+    finally:
+        # Closing the session also releases the advisory lock
+        destination.disconnect()
+
+
+class RefreshJobRunner:
+    """Run data refreshes on a background thread, one at a time, persisting per-table progress."""
+
+    def __init__(self, source_config, destination_config, on_complete=None, tables=SYNC_TABLES, workers=None):
+        self.source_config = source_config
+        self.destination_config = destination_config
+        # Called after a successful refresh, e.g. to drop cached query results
+        self.on_complete = on_complete
+        self.tables = tables
+        # More than one worker copies tables in parallel processes via ParallelSync
+        self.workers = workers
+        self.job_id = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start a refresh unless one is already running; returns (job_id, started)."""
+        with self._lock:
+            if self.is_running():
+                return self.job_id, False
+            self.job_id = uuid.uuid4().hex[:12]
+            self._thread = threading.Thread(target=self._run, args=(self.job_id,),
+                                             name=f"refresh-{self.job_id}", daemon=True)
+            self._thread.start()
+            return self.job_id, True
+
+    def _run(self, job_id):
+        source = DatabaseManager(self.source_config)
+        destination = DatabaseManager(self.destination_config)
+        try:
+            destination.connect()
+            self._create_job(destination, job_id)
+
+            destination.execute_query("SELECT pg_try_advisory_lock(%s)", (REFRESH_LOCK_KEY,))
+            if not destination.cursor.fetchone()[0]:
+                self._finish_job(destination, job_id, "skipped", "Another refresh is already running")
+                return
+
+            source.connect()
+            if self.workers and self.workers > 1:
+                sync = ParallelSync(source, destination, tables=self.tables, workers=self.workers)
+            else:
+                sync = IncrementalSync(source, destination, tables=self.tables)
+            sync.run(
+                on_progress=lambda report: self._record_step(destination, job_id, report["table"], report))
+            destination.ensure_indexes()
+            self._record_step(destination, job_id, INDEXES_STEP)
+            destination.refresh_rollups()
+            self._record_step(destination, job_id, ROLLUP_TABLE)
+            destination.refresh_map_views()
+            self._record_step(destination, job_id, MAP_VIEWS_STEP)
+            self._report_seq_scans(destination)
+            self._finish_job(destination, job_id, "succeeded")
+
+            if self.on_complete:
+                self.on_complete()
+        except Exception as e:
+            print(f"Refresh {job_id} failed: {e}")
+            try:
+                destination.connection.rollback()
+                self._finish_job(destination, job_id, "failed", str(e))
+            except Exception:
+                pass
+        finally:
+            # Closing the session also releases the advisory lock
+            source.disconnect()
+            destination.disconnect()
+
+    @staticmethod
+    def _report_seq_scans(destination):
+        # Any user id will do: only the plan's shape matters, not what the drilldown returns
+        queries = panel_queries()
+        queries.update(drilldown_queries(1))
+        for row in destination.seq_scan_report(queries).itertuples():
+            print(f"Sequential scan of {row.table} (~{row.table_rows} rows) in {row.panel}.{row.query}")
+
+    def _create_job(self, destination, job_id):
+        destination.execute_query(CREATE_JOB_TABLES)
+        destination.execute_query("INSERT INTO etl_refresh_jobs (job_id, state) VALUES (%s, 'running')", (job_id,))
+        for position, step in enumerate([*self.tables, INDEXES_STEP, ROLLUP_TABLE, MAP_VIEWS_STEP]):
+            destination.execute_query(
+                "INSERT INTO etl_refresh_progress (job_id, position, step, state) VALUES (%s, %s, %s, 'pending')",
+                (job_id, position, step))
+        destination.commit()
+
+    def _record_step(self, destination, job_id, step, report=None):
+        report = report or {}
+        destination.execute_query(
+            """UPDATE etl_refresh_progress
+               SET state = 'done', rows_copied = %s, rows_deleted = %s, duration_seconds = %s, updated_at = NOW()
+               WHERE job_id = %s AND step = %s""",
+            (report.get("rows_copied"), report.get("rows_deleted"), report.get("duration_seconds"), job_id, step))
+        destination.commit()
+
+    def _finish_job(self, destination, job_id, state, error=None):
+        destination.execute_query(
+            "UPDATE etl_refresh_jobs SET state = %s, error = %s, finished_at = NOW() WHERE job_id = %s",
+            (state, error, job_id))
+        destination.commit()
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.rollups import ROLLUP_TABLE
+
+
+def rollup_total(source_table, accuracy="approximate"):
+    """Metric counting a source table's rows.
+
+    "approximate" sums the table's daily rollup. A refresh only recounts the days from its watermark
+    onwards, so rows deleted from earlier days stay counted until a rebuild and it can overcount; the
+    exact COUNT(*) is kept under "exact" to be run in the background. "exact" counts the table itself
+    on every run.
+    """
+    exact = {"table": f"public.{source_table}", "expression": "COUNT(*)"}
+    if accuracy == "exact":
+        return exact
+    return {"table": f"public.{ROLLUP_TABLE}", "expression": "SUM(count)", "cast": "bigint",
+            "filter": f"dimension = 'total' AND source_table = '{source_table}'", "exact": exact}
+
+
+# KPI tiles in display order, four per row. Metrics on the same table share one scan.
+KPI_METRICS = OrderedDict([
+    ("user_count", rollup_total("account_management_user")),
+    ("total_views", rollup_total("file_management_fileviewstransaction")),
+    ("total_uploads", rollup_total("file_management_userfile")),
+    ("total_subscribed", {"table": "public.subscription_management_subscriptiontransaction",
+                          "expression": "COUNT(id)", "filter": "status = 'ACTIVE'"}),
+    ("users_active(7_days)", {"table": "public.account_management_user", "expression": "COUNT(id)",
+                              "filter": "last_login >= NOW() - INTERVAL '7 days'"}),
+    ("users_active(30_days)", {"table": "public.account_management_user", "expression": "COUNT(id)",
+                               "filter": "last_login >= NOW() - INTERVAL '30 days'"}),
+    ("total_balance", {"table": "public.finance_management_userwallet",
+                       "expression": "SUM(total_balance + paid_balance)", "format": "money"}),
+    ("total_paid_out", {"table": "public.finance_management_userwallet",
+                        "expression": "SUM(paid_balance)", "format": "money"}),
+])
+
+KPI_ROW_SIZE = 4
+
+
+def compile_kpi_query(metrics=KPI_METRICS):
+    """Compile the metric registry into a single statement returning one row with a column per metric."""
+    by_table = OrderedDict()
+    for key, metric in metrics.items():
+        by_table.setdefault(metric["table"], []).append((key, metric))
+
+    scans = []
+    for i, (table, table_metrics) in enumerate(by_table.items()):
+        columns = []
+        for key, metric in table_metrics:
+            expression = metric["expression"]
+            if metric.get("filter"):
+                expression += f" FILTER (WHERE {metric['filter']})"
+            if metric.get("cast"):
+                expression = f"({expression})::{metric['cast']}"
+            columns.append(f'{expression} AS "{key}"')
+        # When every metric on the table is filtered, only rows matching one of the filters are needed,
+        # which lets the scan use an index on the filtered columns
+        filters = [metric.get("filter") for _, metric in table_metrics]
+        where = f" WHERE {' OR '.join(f'({f})' for f in filters)}" if all(filters) else ""
+        scans.append(f"(SELECT {', '.join(columns)} FROM {table}{where}) AS t{i}")
+
+    return "SELECT * FROM " + "\nCROSS JOIN ".join(scans)
+
+
+def exact_metrics(metrics=KPI_METRICS):
+    """The exact definitions of the metrics shown as estimates, to compile into their own query."""
+    return OrderedDict((key, {**metric["exact"], "format": metric.get("format")})
+                       for key, metric in metrics.items() if "exact" in metric)
+
+
+def kpi_rows(metrics=KPI_METRICS, row_size=KPI_ROW_SIZE):
+    """Split the metric keys into rows of row_size tiles."""
+    keys = list(metrics)
+    return [keys[i:i + row_size] for i in range(0, len(keys), row_size)]
+
+
+def format_metric(key, value, metrics=KPI_METRICS, approximate=False):
+    """Format a metric value for display, marking estimates with ≈."""
+    value = 0 if value is None or pd.isna(value) else value
+    marker = "≈ " if approximate else ""
+    if metrics[key].get("format") == "money":
+        return f"{marker}${value:,.2f}"
+    return f"{marker}{int(value)}" if approximate else int(value)
@@ -0,0 +1,228 @@
+# Live mode: triggers on the source tables NOTIFY what each statement changed, and a listener thread
+# totals those changes for the KPI tiles and sparkline cards. Install or remove the triggers on the
+# source database with `python -m utils.live install` / `python -m utils.live remove`.
+import argparse
+import json
+import select
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+
+import pandas as pd
+from psycopg2 import sql
+
+from utils.db_manager import DatabaseManager
+from utils.general import load_db_config
+
+LIVE_CHANNEL = "dashboard_live"
+
+# Row counts for the KPI tile, plus the rows created today for the card's current bucket
+ROW_MEASURES = OrderedDict([
+    ("rows", "COUNT(*)"),
+    ("today", "COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE)"),
+])
+
+# source table -> measures its triggers publish, the KPI metric each measure moves, and its sparkline card
+LIVE_TABLES = OrderedDict([
+    ("account_management_user", {"measures": ROW_MEASURES, "kpi": {"user_count": "rows"}, "card": "User"}),
+    ("file_management_userfile", {"measures": ROW_MEASURES, "kpi": {"total_uploads": "rows"}, "card": "Uploads"}),
+    ("file_management_fileviewstransaction", {"measures": ROW_MEASURES, "kpi": {"total_views": "rows"},
+                                              "card": "Views"}),
+    ("file_management_filedownloadtransaction", {"measures": ROW_MEASURES, "kpi": {}, "card": "Downloads"}),
+    ("finance_management_userwallet", {
+        "measures": OrderedDict([("balance", "SUM(total_balance + paid_balance)"), ("paid", "SUM(paid_balance)")]),
+        "kpi": {"total_balance": "balance", "total_paid_out": "paid"},
+    }),
+])
+
+# One trigger per event: Postgres only allows transition tables on single-event triggers
+TRIGGER_EVENTS = OrderedDict([
+    ("insert", ("INSERT", "NEW TABLE AS new_rows")),
+    ("update", ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows")),
+    ("delete", ("DELETE", "OLD TABLE AS old_rows")),
+])
+
+
+def live_trigger_sql(table, measures, channel=LIVE_CHANNEL):
+    """SQL creating a table's notify function and its statement-level triggers.
+
+    Each statement sends one notification with its measures over the inserted/new rows ("added") and
+    deleted/old rows ("removed"), so a bulk load is one event rather than one per row.
+    """
+    function = f"{table}_live_notify"
+    aggregate = "jsonb_build_object({})".format(", ".join(f"'{name}', {expression}"
+                                                          for name, expression in measures.items()))
+    statements = [f"""
+CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    added jsonb := '{{}}';
+    removed jsonb := '{{}}';
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT {aggregate} INTO added FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT {aggregate} INTO removed FROM old_rows;
+    END IF;
+    IF added IS DISTINCT FROM removed THEN
+        PERFORM pg_notify('{channel}', jsonb_build_object(
+            'table', TG_TABLE_NAME, 'day', CURRENT_DATE, 'added', added, 'removed', removed)::text);
+    END IF;
+    RETURN NULL;
+END
+$$"""]
+    for suffix, (event, referencing) in TRIGGER_EVENTS.items():
+        statements.append(f"DROP TRIGGER IF EXISTS {table}_live_{suffix} ON {table}")
+        statements.append(f"CREATE TRIGGER {table}_live_{suffix} AFTER {event} ON {table} "
+                          f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()")
+    return statements
+
+
+def install_live_triggers(db, tables=LIVE_TABLES, channel=LIVE_CHANNEL):
+    """Create the live triggers on every table of a connected DatabaseManager that has them declared."""
+    db.execute_query("SELECT relname FROM pg_class WHERE relkind IN ('r', 'p') AND relname = ANY(%s)",
+                     (list(tables),))
+    existing = {row[0] for row in db.fetch_all()}
+    for table, live in tables.items():
+        if table not in existing:
+            continue
+        for statement in live_trigger_sql(table, live["measures"], channel):
+            db.execute_query(statement)
+        print(f"Installed live triggers on {table}")
+    db.commit()
+
+
+def remove_live_triggers(db, tables=LIVE_TABLES):
+    """Drop the live triggers and their functions."""
+    for table in tables:
+        for suffix in TRIGGER_EVENTS:
+            db.execute_query(f"DROP TRIGGER IF EXISTS {table}_live_{suffix} ON {table}")
+        db.execute_query(f"DROP FUNCTION IF EXISTS {table}_live_notify()")
+    db.commit()
+
+
+class LiveListener:
+    """LISTEN for the live triggers' notifications in a background thread and total what they report.
+
+    Totals are changes on top of the destination data the panels query, so reset() them once a refresh
+    has copied the source into the destination. Notifications sent while the listener is reconnecting
+    are lost, and so are changes made between a refresh copying a table and reset(); the next refresh
+    brings the tiles back in line.
+    """
+
+    def __init__(self, db_config, tables=LIVE_TABLES, channel=LIVE_CHANNEL, poll_seconds=5, retry_seconds=10):
+        self.db_config = db_config
+        self.tables = tables
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self._kpi = defaultdict(float)
+        self._card_days = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.events = 0
+        self.last_event_at = None
+
+    def start(self):
+        """Start listening, unless already running."""
+        with self._lock:
+            if self.is_running():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._listen, name="live-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def reset(self):
+        """Forget the changes counted so far."""
+        with self._lock:
+            self._kpi.clear()
+            self._card_days.clear()
+
+    def apply(self, payload):
+        """Add one notification's changes to the totals."""
+        live = self.tables.get(payload["table"])
+        if live is None:
+            return
+
+        def delta(measure):
+            return (payload["added"].get(measure) or 0) - (payload["removed"].get(measure) or 0)
+
+        with self._lock:
+            for key, measure in live["kpi"].items():
+                self._kpi[key] += delta(measure)
+            if live.get("card"):
+                self._card_days[(live["card"], date.fromisoformat(payload["day"]))] += delta("today")
+            self.events += 1
+            self.last_event_at = time.time()
+
+    def snapshot(self):
+        """The totals so far as ({kpi key: change}, {(card, day): rows created})."""
+        with self._lock:
+            return dict(self._kpi), dict(self._card_days)
+
+    def _listen(self):
+        while not self._stop.is_set():
+            db = DatabaseManager(self.db_config)
+            try:
+                db.connect()
+                db.connection.autocommit = True
+                db.execute_query(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                while not self._stop.is_set():
+                    if select.select([db.connection], [], [], self.poll_seconds)[0]:
+                        db.connection.poll()
+                        while db.connection.notifies:
+                            self.apply(json.loads(db.connection.notifies.pop(0).payload))
+            except Exception as e:
+                print(f"Live listener error: {e}")
+                self._stop.wait(self.retry_seconds)
+            finally:
+                db.disconnect()
+
+
+def live_kpi_value(value, change):
+    """A KPI value with the live change added; None stays None when nothing changed."""
+    if not change:
+        return value
+    return (0 if value is None or pd.isna(value) else float(value)) + change
+
+
+def live_series(card_series, card_days):
+    """Add the rows created live to each card's current (last) bucket."""
+    updated = OrderedDict()
+    for name, series_df in card_series.items():
+        if not series_df.empty:
+            since = pd.Timestamp(series_df['period'].iat[-1]).date()
+            change = sum(rows for (card, day), rows in card_days.items() if card == name and day >= since)
+            if change:
+                series_df = series_df.copy()
+                series_df.loc[series_df.index[-1], 'count'] += change
+        updated[name] = series_df
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Install or remove the live-mode triggers on the source database")
+    parser.add_argument("action", choices=["install", "remove"])
+    parser.add_argument("--db-prefix", default="SOURCE_DB_")
+    args = parser.parse_args()
+
+    db = DatabaseManager(load_db_config(args.db_prefix)).connect()
+    try:
+        if args.action == "install":
+            install_live_triggers(db)
+        else:
+            remove_live_triggers(db)
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
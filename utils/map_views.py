@@ -0,0 +1,40 @@
+from collections import OrderedDict
+
+from utils.rollups import ROLLUP_TABLE
+
+# Map metric -> (materialized view, unique key column, value column, defining query).
+# Upload and user counts are folded from the daily rollup, so they must be refreshed after it.
+MAP_VIEWS = OrderedDict([
+    ("File Uploads", ("map_country_uploads", "country", "file_count", f"""
+        SELECT dimension_value AS country, SUM(count)::bigint AS file_count
+        FROM {ROLLUP_TABLE}
+        WHERE source_table = 'file_management_userfile' AND dimension = 'country'
+        GROUP BY 1
+    """)),
+    ("Balance", ("map_country_balance", "country", "total_balance", """
+        SELECT u.country, SUM(uw.total_balance) AS total_balance
+        FROM account_management_user u
+        JOIN finance_management_userwallet uw ON u.id = uw.user_id
+        GROUP BY 1
+    """)),
+    ("Users", ("map_country_users", "country", "total_users", f"""
+        SELECT dimension_value AS country, SUM(count)::bigint AS total_users
+        FROM {ROLLUP_TABLE}
+        WHERE source_table = 'account_management_user' AND dimension = 'country'
+        GROUP BY 1
+    """)),
+    # The latest rate per country, so the view has a unique key to refresh concurrently on
+    ("Earning Rate", ("map_country_earning_rate", "country_name", "earning_rate", """
+        SELECT DISTINCT ON (country_name) country_name, earning_rate
+        FROM finance_management_countrywiseearning
+        ORDER BY country_name, id DESC
+    """)),
+])
+
+
+def map_view_query(metric, views=MAP_VIEWS):
+    """Return SQL reading a map metric's view: the location column, then the value column."""
+    if metric not in views:
+        raise ValueError(f"No map view for {metric}")
+    view, key_column, value_column, _ = views[metric]
+    return f"SELECT {key_column}, {value_column} FROM {view}"
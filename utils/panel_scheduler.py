@@ -0,0 +1,62 @@
+from collections import OrderedDict, defaultdict
+from concurrent.futures import as_completed
+
+
+class PanelScheduler:
+    """Fetch every declared panel's queries concurrently and hand panels to rendering as their data arrives."""
+
+    def __init__(self, submit):
+        # submit(query, panel, params) starts one query and returns a Future of its DataFrame
+        self.submit = submit
+        self._panels = OrderedDict()
+        self._queries = {}
+
+    def add(self, panel, queries):
+        """Declare a panel's queries as {key: sql} or {key: (sql, params)}; fetching starts immediately."""
+        futures = OrderedDict()
+        for key, query in queries.items():
+            sql, params = query if isinstance(query, tuple) else (query, None)
+            futures[key] = self.submit(sql, panel, params)
+        self._panels[panel] = futures
+        self._queries[panel] = queries
+
+    def done(self, panel):
+        """Whether all of a panel's queries have finished, without waiting for them."""
+        return all(future.done() for future in self._panels[panel].values())
+
+    def error(self, panel):
+        """The exception a finished query of the panel raised, or None; doesn't wait for running queries."""
+        for future in self._panels[panel].values():
+            if future.done() and future.exception() is not None:
+                return future.exception()
+        return None
+
+    def result(self, panel):
+        """Block until all of a panel's queries are done and return {key: DataFrame}."""
+        return {key: future.result() for key, future in self._panels[panel].items()}
+
+    def result_for(self, panel, queries):
+        """Results for a panel's queries, reusing a fetch declared earlier with the same queries once.
+
+        Later calls fetch again, so a scheduler kept by a fragment doesn't keep serving old results.
+        """
+        if self._queries.pop(panel, None) != queries:
+            self.add(panel, queries)
+            del self._queries[panel]
+        return self.result(panel)
+
+    def as_completed(self):
+        """Yield (panel, results) for each declared panel in the order their queries finish."""
+        # Identical queries joining one fetch share a Future, so a Future can stand for several entries
+        future_panels = defaultdict(list)
+        for panel, futures in self._panels.items():
+            for future in futures.values():
+                future_panels[future].append(panel)
+        pending = {panel: len(futures) for panel, futures in self._panels.items()}
+        for panel in [panel for panel, count in pending.items() if count == 0]:
+            yield panel, {}
+        for future in as_completed(future_panels):
+            for panel in future_panels[future]:
+                pending[panel] -= 1
+                if pending[panel] == 0:
+                    yield panel, self.result(panel)
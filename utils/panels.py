@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.kpi import compile_kpi_query, exact_metrics
+from utils.map_views import map_view_query
+from utils.rollups import dimension_query
+from utils.subscriptions import SUBSCRIPTION_STATUS_QUERY
+from utils.timeseries import build_series_query, build_wallet_query
+
+PAYOUTS_QUERY = '''SELECT wm.method_name,SUM(wt.amount)
+    	FROM finance_management_withdrawmethod wm
+    	JOIN finance_management_withdrawrequesttransaction wt
+    	ON wm.id = wt.withdraw_method_id GROUP BY
+    1
+    '''
+
+# Cap the points shipped to the browser at roughly the chart's width in pixels
+WALLET_MAX_POINTS = 1200
+
+
+def panel_queries(time_period='week', metric='Balance'):
+    """Every dashboard panel's queries for the page's selections, as {panel: {key: sql}} in page order.
+
+    kpi_exact holds the exact counts of the KPI tiles that kpi only estimates, if there are any.
+    """
+    exact = exact_metrics()
+    return OrderedDict([
+        ("kpi", {"values": compile_kpi_query()}),
+        *([("kpi_exact", {"values": compile_kpi_query(exact)})] if exact else []),
+        ("cards", {"series": build_series_query(time_period)}),
+        ("map", {"map": map_view_query(metric)}),
+        ("wallet", {"wallet": build_wallet_query('day')}),
+        ("category", {
+            "uploads": dimension_query('file_management_userfile', 'category', 'category_name', 'upload_count'),
+            "views": dimension_query('file_management_fileviewstransaction', 'category', 'category_name',
+                                     'view_count'),
+        }),
+        ("subscriptions", {"status": SUBSCRIPTION_STATUS_QUERY}),
+        ("payouts", {"payouts": PAYOUTS_QUERY}),
+        ("browser", {
+            "browser": dimension_query('file_management_filedownloadtransaction', 'browser',
+                                       'browser_name') + ' ORDER BY 2 DESC LIMIT 5',
+        }),
+        ("device", {
+            "device": dimension_query('file_management_filedownloadtransaction', 'device',
+                                      'device_name') + ' ORDER BY 2 DESC',
+        }),
+    ])
+
+
+def category_shares(uploads_df, views_df):
+    """Upload and view counts per category side by side, with each category's percentage of the total."""
+    merged_df = pd.merge(uploads_df, views_df, on='category_name', how='outer').fillna(0)
+    merged_df['upload_percentage'] = (merged_df['upload_count'] / merged_df['upload_count'].sum()) * 100
+    merged_df['view_percentage'] = (merged_df['view_count'] / merged_df['view_count'].sum()) * 100
+    return merged_df
@@ -0,0 +1,136 @@
+import atexit
+import math
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from psycopg2 import sql
+
+from utils.bulk_io import table_identifier
+from utils.db_manager import DatabaseManager
+from utils.sync import CREATE_SYNC_STATE_TABLE, SYNC_TABLES, IncrementalSync
+
+FOREIGN_KEYS_QUERY = """
+SELECT conrelid::regclass::text, confrelid::regclass::text
+FROM pg_constraint
+WHERE contype = 'f'
+"""
+
+ROW_ESTIMATE_QUERY = "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass"
+
+INTEGER_TYPES = ("smallint", "integer", "bigint")
+
+# Each worker process keeps one source and one destination connection for all its chunks
+_worker_sync = None
+
+
+def _init_worker(source_config, destination_config, batch_size):
+    global _worker_sync
+    source = DatabaseManager(source_config).connect()
+    destination = DatabaseManager(destination_config).connect()
+    atexit.register(source.disconnect)
+    atexit.register(destination.disconnect)
+    _worker_sync = IncrementalSync(source, destination, batch_size=batch_size)
+
+
+def _copy_chunk(plan, id_range):
+    return _worker_sync.copy_range(plan, id_range)
+
+
+class ParallelSync:
+    """Run IncrementalSync across a process pool.
+
+    A table starts as soon as the tables it references by foreign key are done. Tables with a
+    single integer key and more than chunk_rows rows are split into id ranges on a full load.
+    """
+
+    def __init__(self, source, destination, tables=SYNC_TABLES, workers=4, chunk_rows=1_000_000, batch_size=50000):
+        # source and destination are connected DatabaseManager instances used for planning;
+        # workers open their own connections from the same configs
+        self.source = source
+        self.destination = destination
+        self.tables = tables
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.batch_size = batch_size
+        self.sync = IncrementalSync(source, destination, tables=tables, batch_size=batch_size)
+
+    def dependencies(self):
+        """Map each table to the other synced tables it references by foreign key."""
+        self.source.execute_query(FOREIGN_KEYS_QUERY)
+        depends_on = {table: set() for table in self.tables}
+        for child, parent in self.source.fetch_all():
+            child, parent = child.split('.')[-1], parent.split('.')[-1]
+            if child in depends_on and parent in depends_on and child != parent:
+                depends_on[child].add(parent)
+        self.source.commit()
+        return depends_on
+
+    def chunks(self, plan):
+        """Split a full load of a large table into id ranges; everything else is one chunk."""
+        key = plan["primary_key"]
+        if plan["lower"] is not None or len(key) != 1 or plan["column_types"][key[0]] not in INTEGER_TYPES:
+            return [None]
+
+        self.source.execute_query(ROW_ESTIMATE_QUERY, (plan["table"],))
+        estimate = self.source.cursor.fetchone()[0]
+        if estimate <= self.chunk_rows:
+            self.source.commit()
+            return [None]
+
+        self.source.execute_query(sql.SQL("SELECT MIN({0}), MAX({0}) FROM {1}").format(
+            sql.Identifier(key[0]), table_identifier(plan["table"])))
+        low, high = self.source.cursor.fetchone()
+        self.source.commit()
+        if low is None:
+            return [None]
+        step = math.ceil((high - low + 1) / math.ceil(estimate / self.chunk_rows))
+        return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+    def run(self, full=False, on_progress=None):
+        """Sync every table and return their reports in table order; on_progress gets each as it finishes."""
+        self.destination.execute_query(CREATE_SYNC_STATE_TABLE)
+        self.destination.commit()
+
+        waiting_on = self.dependencies()
+        plans, copied, started, pending_chunks, reports = {}, {}, {}, {}, {}
+        running = {}
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.source.db_config, self.destination.db_config,
+                                           self.batch_size)) as pool:
+
+            def launch(table_name):
+                started[table_name] = time.perf_counter()
+                plans[table_name] = self.sync.plan_table(table_name, full=full)
+                chunks = self.chunks(plans[table_name])
+                copied[table_name], pending_chunks[table_name] = 0, len(chunks)
+                for id_range in chunks:
+                    running[pool.submit(_copy_chunk, plans[table_name], id_range)] = table_name
+
+            while len(reports) < len(self.tables):
+                ready = [t for t in self.tables if t not in plans and not waiting_on[t]]
+                if not ready and not running:
+                    # Circular foreign keys: start the earliest remaining table anyway
+                    ready = [next(t for t in self.tables if t not in plans)]
+                for table_name in ready:
+                    launch(table_name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    table_name = running.pop(future)
+                    copied[table_name] += future.result()
+                    pending_chunks[table_name] -= 1
+                    if pending_chunks[table_name]:
+                        continue
+
+                    report = self.sync.finish_table(plans[table_name], copied[table_name],
+                                                    time.perf_counter() - started[table_name])
+                    reports[table_name] = report
+                    if on_progress:
+                        on_progress(report)
+                    for dependencies in waiting_on.values():
+                        dependencies.discard(table_name)
+
+        return [reports[table_name] for table_name in self.tables]
@@ -0,0 +1,134 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+from sqlalchemy import text
+
+from utils.query_cache import QueryCache
+
+logger = logging.getLogger("dashboard.performance")
+
+
+class QueryTimings:
+    """How long each distinct query took the last time it actually ran, kept across page runs.
+
+    Shared by every session, so the slowest queries stay known after later runs answer them from
+    the query cache in a fraction of a millisecond.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, panel, query, params=None):
+        with self._lock:
+            key = QueryCache.make_key(query, params)
+            self._entries[key] = (elapsed_ms, panel, query, params)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def slowest(self, n=3):
+        """The n slowest recorded queries as (ms, panel, query, params)."""
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda item: item[0], reverse=True)[:n]
+
+
+class PanelProfiler:
+    """Per-panel query and render timings for one page run, logged as one JSON object per event.
+
+    Query time only counts queries this run actually executed, not those answered from the query
+    cache; "executed" says how many there were. Times are summed per panel, so a panel whose queries
+    run concurrently can show more query time than it took on the clock. Bytes are the pandas memory
+    of the returned frames.
+    """
+
+    def __init__(self, timings=None):
+        # Executions are also recorded here, to find the slowest queries beyond this run
+        self.timings = QueryTimings() if timings is None else timings
+        self._panels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _panel(self, panel):
+        return self._panels.setdefault(panel, {"panel": panel, "queries": 0, "executed": 0, "query_ms": 0.0,
+                                               "rows": 0, "bytes": 0, "render_ms": 0.0})
+
+    def _log(self, event, **fields):
+        logger.info(json.dumps({"event": event, **fields}, default=str))
+
+    def instrument(self, submit):
+        """Wrap a submit(query, panel, params) function so the frames its Futures resolve to are counted."""
+        def counted_submit(query, panel, params=None):
+            counted = Future()
+
+            def count(future):
+                try:
+                    df = future.result()
+                except BaseException as e:
+                    counted.set_exception(e)
+                    return
+                size = int(df.memory_usage(deep=True).sum())
+                with self._lock:
+                    record = self._panel(panel)
+                    record["queries"] += 1
+                    record["rows"] += len(df)
+                    record["bytes"] += size
+                self._log("query", panel=panel, rows=len(df), bytes=size)
+                counted.set_result(df)
+
+            submit(query, panel, params).add_done_callback(count)
+            return counted
+
+        return counted_submit
+
+    @contextmanager
+    def execution(self, panel, query, params=None):
+        """Time running a query against the database, as opposed to serving it from a cache."""
+        start = time.perf_counter()
+        yield
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            record = self._panel(panel)
+            record["executed"] += 1
+            record["query_ms"] += elapsed_ms
+        self.timings.record(elapsed_ms, panel, query, params)
+        self._log("execute", panel=panel, ms=round(elapsed_ms, 2))
+
+    @contextmanager
+    def render(self, panel):
+        """Time building a panel's figures and Streamlit elements."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._panel(panel)["render_ms"] += elapsed_ms
+            self._log("render", panel=panel, ms=round(elapsed_ms, 2))
+
+    def summary(self):
+        """One row per panel, slowest (query + render) first."""
+        with self._lock:
+            df = pd.DataFrame(list(self._panels.values()),
+                              columns=["panel", "queries", "executed", "query_ms", "rows", "bytes", "render_ms"])
+        df["total_ms"] = df["query_ms"] + df["render_ms"]
+        return df.sort_values("total_ms", ascending=False).round(1).reset_index(drop=True)
+
+    def slowest_queries(self, n=3):
+        """The n slowest queries executed so far, this run or earlier ones, as (ms, panel, query, params)."""
+        return self.timings.slowest(n)
+
+
+def explain_analyze(conn, query, params=None):
+    """Run EXPLAIN (ANALYZE, BUFFERS) for a query on a SQLAlchemy connection and return the plan text.
+
+    ANALYZE executes the query, so only use it for the dashboard's read-only SELECTs.
+    """
+    result = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), params or {})
+    return "\n".join(row[0] for row in result)
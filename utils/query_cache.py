@@ -0,0 +1,161 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_sql(query):
+    """Collapse whitespace and trailing semicolons so equivalent SQL maps to the same key."""
+    return re.sub(r'\s+', ' ', str(query)).strip().rstrip(';').strip()
+
+
+class QueryCache:
+    """Thread-safe LRU cache of query results with a TTL per entry.
+
+    Misses are single-flight: while one caller fetches a key, other callers for the same key share
+    that fetch's result instead of running the query again. Shared across sessions, this turns N
+    viewers opening the page at once into one execution per query.
+    """
+
+    def __init__(self, max_entries=256, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(query, params=None):
+        """Build a cache key from normalized SQL and the bound parameters."""
+        bound = tuple(sorted((str(k), repr(v)) for k, v in (params or {}).items()))
+        return normalize_sql(query), bound
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise."""
+        with self._lock:
+            return self._lookup(key)
+
+    def contains(self, key):
+        """Whether key has a live entry, without counting a hit or miss or refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def _lookup(self, key):
+        # Callers hold self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries past max_entries."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        # Callers hold self._lock
+        ttl = self.default_ttl if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _claim(self, key):
+        """A Future of key's value and, if this caller has to fetch it, the generation it fetches for."""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                flight = Future()
+                flight.set_result(value)
+                return flight, None
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, None
+            flight = self._in_flight[key] = Future()
+            self.executed += 1
+            return flight, self._generation
+
+    def _lead(self, key, flight, generation, fetch, ttl):
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._land(key, flight)
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            # A clear() while fetching means the result may predate a refresh: hand it to the waiters
+            # but don't cache it. Checked under the lock, so a clear() can't slip in before the store
+            if generation == self._generation:
+                self._store(key, value, ttl)
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+        flight.set_result(value)
+        return value
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+
+    def get_or_fetch(self, query, fetch, params=None, ttl=None):
+        """Return the cached result for query/params, calling fetch() on a miss.
+
+        If the same query is already being fetched, wait for that fetch and share its result, or
+        its exception, instead of calling fetch() again.
+        """
+        key = self.make_key(query, params)
+        flight, generation = self._claim(key)
+        if generation is None:
+            return flight.result()
+        return self._lead(key, flight, generation, fetch, ttl)
+
+    def submit(self, query, fetch, executor, params=None, ttl=None):
+        """Like get_or_fetch, but return a Future instead of waiting for it.
+
+        Only a miss that nobody is fetching yet takes an executor thread, to run fetch(). Hits get
+        a finished Future and callers joining a fetch get that fetch's Future, so waiting on a slow
+        query never ties up the executor's threads.
+        """
+        key = self.make_key(query, params)
+        flight, generation = self._claim(key)
+        if generation is not None:
+            try:
+                executor.submit(self._lead, key, flight, generation, fetch, ttl)
+            except BaseException as e:
+                # E.g. the executor is shutting down; don't leave other callers joining a fetch that never runs
+                self._land(key, flight)
+                flight.set_exception(e)
+                raise
+        return flight
+
+    def clear(self):
+        """Drop every entry, e.g. after a data refresh. Fetches already running are no longer joined."""
+        with self._lock:
+            self._entries.clear()
+            self._in_flight.clear()
+            self._generation += 1
+
+    def stats(self):
+        """Hit, miss, executed and coalesced counts, plus the fetches running right now."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._in_flight)}
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,65 @@
+ROLLUP_TABLE = "activity_daily_rollup"
+WATERMARK_TABLE = "activity_rollup_watermark"
+
+# source table -> dimension -> (value expression, joins). The source table is aliased as "s";
+# inner joins keep the same rows the dashboard panels used to count from the raw tables.
+ROLLUP_SOURCES = {
+    "account_management_user": {
+        "total": ("''", ""),
+        "country": ("s.country", ""),
+    },
+    "account_management_referraltransaction": {
+        "total": ("''", ""),
+    },
+    "account_management_followerstransaction": {
+        "total": ("''", ""),
+    },
+    "file_management_userfile": {
+        "total": ("''", ""),
+        "country": ("u.country", "JOIN account_management_user u ON s.user_id = u.id"),
+        "category": ("c.category_name", "JOIN file_management_category c ON s.category_id_id = c.id"),
+    },
+    "file_management_filedownloadtransaction": {
+        "total": ("''", ""),
+        "country": ("s.country_name", ""),
+        "browser": ("s.browser_name", ""),
+        "device": ("s.device_name", ""),
+    },
+    "file_management_fileviewstransaction": {
+        "total": ("''", ""),
+        "category": ("c.category_name", "JOIN file_management_userfile f ON s.file_id = f.id "
+                                        "JOIN file_management_category c ON f.category_id_id = c.id"),
+    },
+}
+
+CREATE_ROLLUP_TABLES = f"""
+CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    source_table TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    dimension_value TEXT NOT NULL,
+    day DATE NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (source_table, dimension, dimension_value, day)
+);
+CREATE INDEX IF NOT EXISTS {ROLLUP_TABLE}_dimension_day_idx ON {ROLLUP_TABLE} (dimension, source_table, day);
+CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+    source_table TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    watermark TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (source_table, dimension)
+);
+"""
+
+
+def dimension_query(source_table, dimension, value_alias="dimension_value", count_alias="count",
+                    sources=ROLLUP_SOURCES):
+    """Return SQL totalling a dimension's rollup over all days, one row per dimension value."""
+    if dimension not in sources.get(source_table, {}):
+        raise ValueError(f"No {dimension} rollup for {source_table}")
+    return f"""
+    SELECT dimension_value AS {value_alias}, SUM(count)::bigint AS {count_alias}
+    FROM {ROLLUP_TABLE}
+    WHERE source_table = '{source_table}' AND dimension = '{dimension}'
+    GROUP BY 1
+    """
@@ -0,0 +1,39 @@
+import pandas as pd
+
+# Per-plan counts plus a grand total in one pass; is_total marks the GROUPING SETS total row.
+# Counts are over the user/subscription join, so a user with several transactions counts once per transaction.
+SUBSCRIPTION_STATUS_QUERY = """
+SELECT status, subscription_name, GROUPING(status) = 1 AS is_total, COUNT(*) AS users
+FROM (
+    SELECT
+        CASE WHEN s.id IS NULL THEN 'Unsubscribed' ELSE 'Subscribed' END AS status,
+        s.name AS subscription_name
+    FROM public.account_management_user u
+    LEFT JOIN public.subscription_management_subscriptiontransaction st ON u.id = st.user_id
+    LEFT JOIN public.subscription_management_subscriptionplanname s ON st.subscription_plan_id = s.id
+) AS joined
+GROUP BY GROUPING SETS ((status, subscription_name), ())
+"""
+
+
+def build_sunburst_data(status_df):
+    """Turn the grouped status counts into the label/parent/values/percentage hierarchy of the sunburst."""
+    groups = status_df[~status_df['is_total']]
+    total = int(status_df.loc[status_df['is_total'], 'users'].sum())
+
+    subscribed = groups[(groups['status'] == 'Subscribed') & groups['subscription_name'].notna()]
+    subscribed_counts = pd.DataFrame({
+        'label': subscribed['subscription_name'],
+        'parent': 'Subscribed',
+        'values': subscribed['users'].astype('int64'),
+    }).sort_values('label')
+    unsubscribed_count = int(groups.loc[groups['status'] == 'Unsubscribed', 'users'].sum())
+
+    sunburst_data = pd.concat([
+        pd.DataFrame({'label': ['All Users'], 'parent': [''], 'values': [total]}),
+        pd.DataFrame({'label': ['Subscribed'], 'parent': ['All Users'], 'values': [subscribed_counts['values'].sum()]}),
+        subscribed_counts,
+        pd.DataFrame({'label': ['Unsubscribed'], 'parent': ['All Users'], 'values': [unsubscribed_count]}),
+    ], ignore_index=True)
+    sunburst_data['percentage'] = sunburst_data['values'] / total * 100 if total else 0.0
+    return sunburst_data
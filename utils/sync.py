@@ -0,0 +1,260 @@
+import time
+
+from psycopg2 import sql
+
+from utils.bulk_io import table_identifier
+
+SYNC_STATE_TABLE = "etl_sync_state"
+
+# Tables the dashboard reads, parents before children so foreign keys resolve
+SYNC_TABLES = [
+    "account_management_user",
+    "account_management_referraltransaction",
+    "account_management_followerstransaction",
+    "file_management_category",
+    "file_management_userfile",
+    "file_management_fileviewstransaction",
+    "file_management_filedownloadtransaction",
+    "finance_management_userwallet",
+    "finance_management_withdrawmethod",
+    "finance_management_withdrawrequesttransaction",
+    "finance_management_countrywiseearning",
+    "subscription_management_subscriptionplanname",
+    "subscription_management_subscriptiontransaction",
+]
+
+# First column found is used; updated_at also catches edits, id only catches inserts
+WATERMARK_CANDIDATES = ("updated_at", "modified_at", "created_at", "id")
+# Flagged rows are deleted from the copied window only, so soft deletes are picked up on tables whose
+# watermark is updated_at / modified_at (setting the flag moves the row into the next window). With a
+# created_at or id watermark a row flagged after it was copied is never read again and stays.
+SOFT_DELETE_CANDIDATES = ("deleted_at", "is_deleted")
+
+# Timestamp watermarks are re-read this far back: a row committed after MAX(column) was taken can
+# carry an earlier created_at / updated_at (long transactions, auto_now set before the commit). The
+# upsert makes copying a row twice harmless.
+WATERMARK_LOOKBACK = "1 day"
+
+CREATE_SYNC_STATE_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {SYNC_STATE_TABLE} (
+    table_name TEXT PRIMARY KEY,
+    watermark_column TEXT NOT NULL,
+    watermark TEXT,
+    rows_copied BIGINT NOT NULL DEFAULT 0,
+    rows_deleted BIGINT NOT NULL DEFAULT 0,
+    duration_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+TABLE_COLUMNS_QUERY = """
+SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+FROM pg_attribute a
+WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attnum
+"""
+
+PRIMARY_KEY_QUERY = """
+SELECT a.attname
+FROM pg_index i
+JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+WHERE i.indrelid = %s::regclass AND i.indisprimary
+"""
+
+
+class IncrementalSync:
+    """Copy new and changed rows from a source database into the dashboard database.
+
+    Each table keeps a high-water mark in etl_sync_state; rows from lookback before it onwards are
+    copied and upserted on the primary key (id watermarks have no lookback). Tables with a soft-delete
+    column have the flagged rows of that window removed, which only catches later deletes on tables
+    with an updated_at / modified_at watermark.
+    """
+
+    def __init__(self, source, destination, tables=SYNC_TABLES, batch_size=50000, lookback=WATERMARK_LOOKBACK):
+        # source and destination are connected DatabaseManager instances
+        self.source = source
+        self.destination = destination
+        self.tables = tables
+        self.batch_size = batch_size
+        self.lookback = lookback
+
+    def run(self, full=False, on_progress=None):
+        """Sync every table and return one report dict per table.
+
+        full=True ignores the stored watermarks and recopies everything. on_progress, if given,
+        is called with each table's report as soon as that table finishes.
+        """
+        self.destination.execute_query(CREATE_SYNC_STATE_TABLE)
+        self.destination.commit()
+        reports = []
+        for table_name in self.tables:
+            report = self.sync_table(table_name, full=full)
+            reports.append(report)
+            if on_progress:
+                on_progress(report)
+        return reports
+
+    def sync_table(self, table_name, full=False):
+        """Copy one table's changes since its watermark and record the new watermark."""
+        start = time.perf_counter()
+        plan = self.plan_table(table_name, full=full)
+        copied = self.copy_range(plan)
+        return self.finish_table(plan, copied, time.perf_counter() - start)
+
+    def plan_table(self, table_name, full=False):
+        """Work out what to copy for a table: its columns, key, watermark column and watermark bounds.
+
+        The destination table is created here, so chunks of the plan can be copied independently.
+        """
+        columns, column_types = self.describe(table_name)
+        primary_key = self.primary_key(table_name) or ["id"]
+        watermark_column = next(c for c in WATERMARK_CANDIDATES if c in columns)
+        self.ensure_destination_table(table_name, columns, column_types, primary_key)
+
+        self.source.execute_query(
+            sql.SQL("SELECT MAX({})::text FROM {}").format(sql.Identifier(watermark_column), table_identifier(table_name)))
+        upper = self.source.cursor.fetchone()[0]
+        self.source.commit()
+
+        watermark = None if full else self.get_watermark(table_name)
+        lower = watermark
+        watermark_type = column_types[watermark_column]
+        if watermark is not None and self.lookback and watermark_type.startswith(("timestamp", "date")):
+            self.source.execute_query(sql.SQL("SELECT (%s::{} - %s::interval)::text").format(sql.SQL(watermark_type)),
+                                      (watermark, self.lookback))
+            lower = self.source.cursor.fetchone()[0]
+            self.source.commit()
+
+        return {
+            "table": table_name,
+            "columns": columns,
+            "column_types": column_types,
+            "primary_key": primary_key,
+            "watermark_column": watermark_column,
+            "soft_delete_column": next((c for c in SOFT_DELETE_CANDIDATES if c in columns), None),
+            "watermark": watermark,
+            "lower": lower,
+            "upper": upper,
+        }
+
+    @staticmethod
+    def watermark_window(plan):
+        """SQL conditions and params selecting the rows between the plan's watermarks."""
+        watermark = sql.Identifier(plan["watermark_column"])
+        conditions, params = [], {}
+        if plan["lower"] is not None:
+            conditions.append(sql.SQL("{} >= %(lower)s").format(watermark))
+            params["lower"] = plan["lower"]
+        if plan["upper"] is not None:
+            conditions.append(sql.SQL("{} <= %(upper)s").format(watermark))
+            params["upper"] = plan["upper"]
+        return conditions, params
+
+    def copy_range(self, plan, id_range=None):
+        """Copy the plan's rows between its watermarks, optionally only ids within id_range=(low, high)."""
+        conditions, params = self.watermark_window(plan)
+        if id_range is not None:
+            conditions.append(sql.SQL("{} BETWEEN %(low_id)s AND %(high_id)s").format(
+                sql.Identifier(plan["primary_key"][0])))
+            params["low_id"], params["high_id"] = id_range
+        where = sql.SQL(" AND ").join(conditions) if conditions else None
+
+        rows = self.source.stream_table(plan["table"], plan["columns"], where=where, params=params,
+                                        itersize=self.batch_size)
+        copied = self.destination.copy_rows(plan["table"], plan["columns"], rows, batch_size=self.batch_size,
+                                            conflict_columns=plan["primary_key"])
+        self.source.commit()
+        return copied
+
+    def finish_table(self, plan, copied, duration):
+        """Apply soft deletes, store the new watermark and return the table's report."""
+        table_name = plan["table"]
+        deleted = self.remove_soft_deleted(plan) if plan["soft_delete_column"] else 0
+        report = {"table": table_name, "watermark_column": plan["watermark_column"],
+                  "watermark": plan["upper"] or plan["watermark"], "rows_copied": copied, "rows_deleted": deleted,
+                  "duration_seconds": round(duration, 3)}
+        self.save_watermark(report)
+        print(f"Synced {table_name}: {copied} rows copied, {deleted} deleted in {duration:.2f}s")
+        return report
+
+    def describe(self, table_name):
+        """Column names and SQL types of a source table."""
+        self.source.execute_query(TABLE_COLUMNS_QUERY, (table_name,))
+        rows = self.source.fetch_all()
+        return [name for name, _ in rows], dict(rows)
+
+    def primary_key(self, table_name):
+        self.source.execute_query(PRIMARY_KEY_QUERY, (table_name,))
+        return [row[0] for row in self.source.fetch_all()]
+
+    def ensure_destination_table(self, table_name, columns, column_types, primary_key):
+        """Create the destination table from the source's column types if it doesn't exist yet.
+
+        Tables created by older migrations may lack the primary key, so a unique index on it is
+        added as well for the upsert to target.
+        """
+        key = sql.SQL(', ').join(map(sql.Identifier, primary_key))
+        definition = sql.SQL(', ').join(
+            sql.SQL("{} {}").format(sql.Identifier(column), sql.SQL(column_types[column])) for column in columns)
+        self.destination.execute_query(sql.SQL("CREATE TABLE IF NOT EXISTS {} ({}, PRIMARY KEY ({}))").format(
+            table_identifier(table_name), definition, key))
+        self.destination.execute_query(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+            sql.Identifier(f"{table_name}_sync_key"), table_identifier(table_name), key))
+        self.destination.commit()
+
+    def remove_soft_deleted(self, plan):
+        """Delete the rows of the copied window the source has flagged as deleted; returns how many.
+
+        Limited to the window so the cost follows the rows copied rather than the table's size.
+        """
+        soft_delete_column = plan["soft_delete_column"]
+        flag = sql.SQL("{} IS NOT NULL" if soft_delete_column == "deleted_at" else "{}").format(
+            sql.Identifier(soft_delete_column))
+        conditions, params = self.watermark_window(plan)
+        self.destination.execute_query(
+            sql.SQL("DELETE FROM {} WHERE {}").format(
+                table_identifier(plan["table"]), sql.SQL(" AND ").join([flag, *conditions])), params)
+        deleted = self.destination.cursor.rowcount
+        self.destination.commit()
+        return deleted
+
+    def get_watermark(self, table_name):
+        self.destination.execute_query(
+            f"SELECT watermark FROM {SYNC_STATE_TABLE} WHERE table_name = %s", (table_name,))
+        row = self.destination.cursor.fetchone()
+        return row[0] if row else None
+
+    def save_watermark(self, report):
+        self.destination.execute_query(
+            f"""INSERT INTO {SYNC_STATE_TABLE}
+                    (table_name, watermark_column, watermark, rows_copied, rows_deleted, duration_seconds, synced_at)
+                VALUES (%(table)s, %(watermark_column)s, %(watermark)s, %(rows_copied)s, %(rows_deleted)s,
+                        %(duration_seconds)s, NOW())
+                ON CONFLICT (table_name) DO UPDATE SET
+                    watermark_column = EXCLUDED.watermark_column,
+                    watermark = EXCLUDED.watermark,
+                    rows_copied = EXCLUDED.rows_copied,
+                    rows_deleted = EXCLUDED.rows_deleted,
+                    duration_seconds = EXCLUDED.duration_seconds,
+                    synced_at = EXCLUDED.synced_at""",
+            report)
+        self.destination.commit()
+
+
+def main():
+    """Run an incremental sync using SOURCE_DB_* and DB_* settings from the environment or .env."""
+    from utils.db_manager import DatabaseManager
+    from utils.general import load_db_config
+
+    source = DatabaseManager(load_db_config("SOURCE_DB_")).connect()
+    destination = DatabaseManager(load_db_config("DB_")).connect()
+    try:
+        IncrementalSync(source, destination).run()
+    finally:
+        source.disconnect()
+        destination.disconnect()
+
+
+if __name__ == "__main__":
+    main()
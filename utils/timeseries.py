@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+from utils.rollups import ROLLUP_TABLE
+
+# Sparkline cards in display order: card name -> source table in the daily rollup
+CARD_SERIES = OrderedDict([
+    ("User", "account_management_user"),
+    ("Referrals", "account_management_referraltransaction"),
+    ("Followers", "account_management_followerstransaction"),
+    ("Uploads", "file_management_userfile"),
+    ("Downloads", "file_management_filedownloadtransaction"),
+    ("Views", "file_management_fileviewstransaction"),
+])
+
+# Width of one bucket for each period accepted by date_trunc
+PERIOD_INTERVALS = {
+    "day": "1 day",
+    "week": "1 week",
+    "month": "1 month",
+    "quarter": "3 months",
+    "year": "1 year",
+}
+
+
+def bucket_window(period, buckets):
+    """Return SQL expressions for the first bucket start and the bucket width."""
+    if period not in PERIOD_INTERVALS:
+        raise ValueError(f"Unknown period: {period}")
+    step = f"INTERVAL '{PERIOD_INTERVALS[period]}'"
+    start = f"date_trunc('{period}', NOW()) - {int(buckets) - 1} * {step}"
+    return start, step
+
+
+def build_series_query(period, buckets=5, series=CARD_SERIES):
+    """Build one statement returning the last `buckets` counts per series as (series, period, count) rows.
+
+    Counts are summed from the daily rollup, so the cost depends on the days in the window rather
+    than on how many rows the source tables hold. Every series gets a row for every bucket.
+    """
+    start, step = bucket_window(period, buckets)
+    names = ", ".join(f"('{name}', '{table}')" for name, table in series.items())
+
+    return f"""
+    WITH buckets AS (
+        SELECT generate_series({start}, date_trunc('{period}', NOW()), {step}) AS period
+    ),
+    counts AS (
+        SELECT source_table, date_trunc('{period}', day) AS period, SUM(count)::bigint AS count
+        FROM {ROLLUP_TABLE}
+        WHERE dimension = 'total' AND day >= ({start})::date
+        GROUP BY 1, 2
+    )
+    SELECT s.series, b.period, COALESCE(c.count, 0) AS count
+    FROM (VALUES {names}) AS s(series, source_table)
+    CROSS JOIN buckets b
+    LEFT JOIN counts c ON c.source_table = s.source_table AND c.period = b.period
+    ORDER BY s.series, b.period
+    """
+
+
+def split_series(series_df, series=CARD_SERIES):
+    """Split the tidy frame into one (period, count) frame per series, in display order."""
+    grouped = dict(tuple(series_df.groupby("series", sort=False)))
+    empty = series_df.iloc[0:0]
+    return OrderedDict(
+        (name, grouped.get(name, empty)[["period", "count"]].reset_index(drop=True)) for name in series
+    )
+
+
+def build_wallet_query(bucket="day"):
+    """Build the running wallet totals as one row per date_trunc bucket instead of one row per wallet."""
+    if bucket not in PERIOD_INTERVALS:
+        raise ValueError(f"Unknown period: {bucket}")
+    return f"""
+    SELECT
+        date_trunc('{bucket}', created_at) AS created_at,
+        SUM(SUM(paid_balance)) OVER (ORDER BY date_trunc('{bucket}', created_at)) AS rolling_paid_balance,
+        SUM(SUM(total_balance + paid_balance)) OVER (ORDER BY date_trunc('{bucket}', created_at)) AS rolling_total_balance
+    FROM public.finance_management_userwallet
+    GROUP BY 1
+    ORDER BY 1
+    """